@@ -37,8 +37,10 @@ scheduler = None    # this should be set to a Scheduler at start-up time
 verbdict = {}       # dictionary, converts words to Verb objects
 gameStatus = 1      # game is RUNNING
 lastroom = None     # last room created; default location for new objects
+restoring = False   # loading a saved game? (then rooms don't become lastroom)
 universe = None     # room which contains all other rooms
 player = None       # game player (esp. for single-user games)
+recorder = None     # replay.Recorder writing down players' commands, if any
 debugging = False   # are we debugging? 
 language = 'english'# a string containing a language default: 'english'
 
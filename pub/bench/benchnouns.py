@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#   benchnouns.py -- time Parser.NounWords with a big vocabulary
+#
+"""
+Register 10,000 or more nouns (some of them several words long) and
+time Parser.NounWords on a set of noun phrases, against the old way of
+doing it: checking every noun in the list.
+
+usage: python benchnouns.py [nouns]
+"""
+
+import sys, time, random, string
+
+import pub
+from pub import pubcore
+
+ADJECTIVES = ['red', 'green', 'rusty', 'old', 'small', 'large', 'shiny']
+
+def oldnounwords(words):
+    """
+    NounWords as it used to be: a string prefix test on every noun
+    """
+    if not words: return 0
+    if words[0] == 'it': return 1
+    if words[0][0] == '"': return 1
+    if pubcore.isInt(words[0]): words[0] = "#"
+    if words[0]=="#" or words[0] in pubcore.nouns:
+        a = string.join(words)
+        matches = filter(lambda x,a=a: a[:len(x)] == x, pubcore.nouns)
+        if not matches: return 1
+        matches.sort(lambda a,b: cmp(len(a),len(b)))
+        longest = matches[len(matches)-1]
+        return len(string.split(longest))
+    return 0
+
+def addnouns(pCount):
+    """
+    add pCount nouns, and return some phrases which start with them
+    """
+    rand = random.Random(1)
+    phrases = []
+    for i in xrange(pCount):
+        noun = 'thing' + str(i)
+        if i % 3 == 0: noun = rand.choice(ADJECTIVES) + ' ' + noun
+        if noun not in pubcore.nouns: pubcore.nouns.append(noun)
+        if i % 100 == 0:
+            phrases.append(string.split(noun) + ['to', 'bob'])
+    return phrases
+
+def timeit(pFunc, pPhrases, pRepeat):
+    start = time.time()
+    for i in xrange(pRepeat):
+        for words in pPhrases: pFunc(words[:])
+    return time.time() - start
+
+def main():
+    count = 10000
+    if len(sys.argv) > 1: count = int(sys.argv[1])
+    phrases = addnouns(count)
+    par = pubcore.Parser()
+    par.NounWords(['rock'])     # bring the trie up to date
+    for words in phrases:
+        assert par.NounWords(words[:]) == oldnounwords(words[:])
+    print len(pubcore.nouns), 'nouns,', len(phrases), 'phrases'
+    print '%-10s %8.3f s' % ('list', timeit(oldnounwords, phrases, 1))
+    print '%-10s %8.3f s' % ('trie', timeit(par.NounWords, phrases, 1))
+
+if __name__ == '__main__': main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+#   benchparse.py -- parser throughput, in JSON for comparing commits
+#
+"""
+Parse the commands in the test transcripts (pub/test/*-input, with the
+games they're played in loaded, so the words are known), and some made
+up ones -- long commands with many objects, and a vocabulary of 10,000
+extra nouns -- and measure, for each set:
+
+    core      Start and ParseCore only, commands per second
+    stream    Parser.ParseStream, commands per second
+    parse     Parser.Parse, commands per second
+    cached    Parser.Parse with a warm parse cache, commands per second
+    objects   objects kept per command by what Parse returns
+    streamed  objects kept per command by what ParseStream returns
+
+Only core, stream and parse bypass the parse cache.  Python 2 can't
+count allocations, so 'objects' counts the objects the garbage collector
+knows about which the results keep alive.
+
+pub2's Locale.parse is timed too, on the sentences of its locale tests,
+if pub2 can be imported (it needs pyparsing).
+
+The results are printed (or written to outfile) as JSON with sorted
+keys, so that runs on different commits can be diffed.
+
+usage: python benchparse.py [repeat] [outfile]
+"""
+
+import sys, os, gc, time, random, string, imp, StringIO
+
+try: import json
+except ImportError: json = None
+
+import pub
+from pub import pubcore
+import pub.debug        # for the verbs in debug-input
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PUBDIR = os.path.dirname(HERE)
+PUB2DIR = os.path.join(os.path.dirname(PUBDIR), 'pub2')
+
+TRANSCRIPTS = ['pubdemo', 'gredgar', 'debug']
+
+class NoCache:
+    """
+    a parse cache which never has anything, to time the parsing itself
+    """
+    def Get(self, pKey):
+        return None
+
+    def Put(self, pKey, pValue):
+        pass
+
+def quietly(pFunc, *pArgs):
+    """
+    call pFunc with pArgs, without printing anything
+    """
+    stdout = sys.stdout
+    sys.stdout = pubcore.NullOutput()
+    try: return pFunc(*pArgs)
+    finally: sys.stdout = stdout
+
+def loadgames():
+    """
+    load the games the transcripts are played in, for their words
+    """
+    pub.scheduler = pubcore.Scheduler('12:00')
+    quietly(__import__, 'pub.pubdemo')
+    stdin = sys.stdin
+    sys.stdin = StringIO.StringIO('\n')    # for its [Press Return.]
+    try: quietly(imp.load_source, 'gredgar',
+                 os.path.join(PUBDIR, 'games', 'gredgar.py'))
+    finally: sys.stdin = stdin
+
+def transcript(pName):
+    """
+    return the commands in test/<pName>-input
+    """
+    f = open(os.path.join(PUBDIR, 'test', pName + '-input'))
+    lines = filter(None, map(string.strip, f.readlines()))
+    f.close()
+    return lines
+
+def multiobject(pCount):
+    """
+    return pCount commands with many objects each
+    """
+    rand = random.Random(1)
+    words = filter(lambda x: ' ' not in x and x not in ('it', 'me', 'self'),
+                   pubcore.nouns)
+    words = words + map(lambda i: 'widget' + str(i), range(20))
+    for word in words[-20:]: pubcore.nouns.Add(word)
+    out = []
+    for i in xrange(pCount):
+        dirobjs = rand.sample(words, rand.randint(3, 8))
+        inobjs = rand.sample(words, rand.randint(1, 4))
+        withobjs = rand.sample(words, rand.randint(1, 3))
+        out.append('get %s and %s from %s with %s' % (
+            string.join(dirobjs[:-1], ', '), dirobjs[-1],
+            string.join(inobjs, ' and '), string.join(withobjs, ' and ')))
+    return out
+
+def vocabulary(pNouns, pCount):
+    """
+    add pNouns nouns, and return pCount commands which use them
+    """
+    rand = random.Random(1)
+    nouns = []
+    for i in xrange(pNouns):
+        noun = 'thing' + str(i)
+        if i % 3 == 0: noun = rand.choice(['red', 'old', 'shiny']) + ' ' + noun
+        pubcore.nouns.Add(noun)
+        nouns.append(noun)
+    out = []
+    for i in xrange(pCount):
+        a, b, c = rand.sample(nouns, 3)
+        out.append('get %s and %s then put it in %s' % (a, b, c))
+    return out
+
+def rate(pFunc, pCmds, pRepeat):
+    """
+    return how many of pCmds a second pFunc does
+    """
+    start = time.time()
+    for i in xrange(pRepeat):
+        for cmd in pCmds: pFunc(cmd)
+    return int(len(pCmds) * pRepeat / max(time.time() - start, 1e-6))
+
+def kept(pFunc, pCmds):
+    """
+    return the objects kept alive per command by pFunc's results
+    """
+    gc.collect()
+    before = len(gc.get_objects())
+    results = map(pFunc, pCmds)
+    gc.collect()
+    count = len(gc.get_objects()) - before - 1     # (the results list)
+    del results
+    return round(float(count) / len(pCmds), 2)
+
+def measure(pCmds, pRepeat):
+    """
+    time a Parser on pCmds every way; return a dictionary of results
+    """
+    par = pubcore.Parser()
+    par.cache = NoCache()
+    def core(pText, par=par):
+        par.Start(pText)
+        while par.ParseCore(): pass
+    def parse(pText, par=par):
+        return par.Parse(pText)
+    def stream(pText, par=par):
+        return par.ParseStream(pText)
+    warm = pubcore.Parser()
+    warm.cache = pubcore.ParseCache(len(pCmds) + 1)
+    quantal = 0
+    for cmds in quietly(map, warm.Parse, pCmds): quantal = quantal + len(cmds)
+    result = {
+        'commands': len(pCmds),
+        'quantal': quantal,
+        'core': quietly(rate, core, pCmds, pRepeat),
+        'stream': quietly(rate, stream, pCmds, pRepeat),
+        'parse': quietly(rate, parse, pCmds, pRepeat),
+        'cached': quietly(rate, warm.Parse, pCmds, pRepeat),
+        'objects': quietly(kept, parse, pCmds),
+        'streamed': quietly(kept, stream, pCmds),
+    }
+    return result
+
+def pub2locale(pRepeat):
+    """
+    time pub2's Locale.parse on its locale tests' sentences; return a
+    dictionary of results, or of why it couldn't be done
+    """
+    import gettext      # (with the standard locale module, not pub2's)
+    locales = os.path.join(PUB2DIR, 'locales')
+    sys.path[:0] = [locales, PUB2DIR]
+    cwd = os.getcwd()
+    os.chdir(locales)      # the locale's files are found from here
+    try:
+        try:
+            import l10n
+            import tests as localetests
+            from semantics import SemanticClause, SemanticNounPhrase, \
+                                  SemanticVerbPhrase
+        except ImportError, e:
+            return {'skipped': str(e)}
+        loc = quietly(l10n.Locale, 'xx', None, None, None,
+                      (SemanticClause, SemanticNounPhrase, SemanticVerbPhrase))
+        texts = [text for (meaning, text) in localetests.parse_tests.values()]
+        texts.sort()
+        failed = []
+        def parse(pText, loc=loc, failed=failed):
+            try: loc.parse(pText)
+            except Exception: failed.append(pText)
+        result = {'commands': len(texts),
+                  'parse': quietly(rate, parse, texts, pRepeat)}
+        result['failed'] = len(failed) / pRepeat
+        return result
+    finally:
+        os.chdir(cwd)
+        del sys.path[:2]
+
+def main():
+    if json is None: sys.exit('benchparse needs the json module (Python 2.6+)')
+    repeat = 20
+    if len(sys.argv) > 1: repeat = int(sys.argv[1])
+    loadgames()
+    cases = {}
+    for name in TRANSCRIPTS:
+        cases[name] = measure(transcript(name), repeat)
+    cases['multiobject'] = measure(multiobject(200), repeat)
+    cases['vocabulary'] = measure(vocabulary(10000, 200), repeat)
+    cases['pub2'] = pub2locale(repeat)
+    results = {'benchmark': 'parse', 'repeat': repeat,
+               'python': string.split(sys.version)[0], 'cases': cases}
+    out = json.dumps(results, sort_keys=True, indent=2)
+    if len(sys.argv) > 2:
+        f = open(sys.argv[2], 'w')
+        f.write(out + '\n')
+        f.close()
+    else: print out
+
+if __name__ == '__main__': main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#   benchsched.py -- time a scripted game under each kind of scheduler
+#
+"""
+Run a scripted game -- a street full of ScriptPlayers walking up and
+down, looking about and waiting -- once with the minute-based Scheduler
+and once with the TurnScheduler, and print how long each one took.
+
+Both jump straight to the next time anything is scheduled for, so they
+should do the same number of updates in about the same time; this is
+to check that counting turns costs nothing extra.
+
+usage: python benchsched.py [actors] [minutes]
+"""
+
+import sys, time
+
+import pub
+from pub.pubcore import *
+from pub import pubobjs
+from pub import gadgets
+
+SCRIPT = ['DO north', 'DO look', 'DELAY 2', 'DO south', 'DO wait',
+          'DELAY 30']
+
+def buildworld(pActors):
+    """
+    make a street of rooms and put pActors script players in it
+    """
+    rooms = []
+    for i in range(5):
+        room = pubobjs.Room('street ' + str(i))
+        if rooms:
+            south = pubobjs.Exit('south,s')
+            south.dest = rooms[-1]
+            north = pubobjs.Exit('north,n')
+            north.dest = room
+            north.MoveTo(rooms[-1])
+        rooms.append(room)
+    for i in range(pActors):
+        actor = gadgets.ScriptPlayer('walker' + str(i))
+        actor.MoveTo(rooms[i % (len(rooms) - 1)])
+        actor.script = SCRIPT
+
+def run(pClass, pActors, pMinutes):
+    """
+    play the game for pMinutes of game time; return the number of
+    updates and the seconds it took
+    """
+    pub.scheduler = pClass('12:00')
+    buildworld(pActors)
+    end = pub.scheduler.minutes + pMinutes
+    updates = 0
+    start = time.time()
+    while pub.scheduler.events and pub.scheduler.minutes < end:
+        pub.scheduler.Update()
+        updates = updates + 1
+    return updates, time.time() - start
+
+def main():
+    actors = 200
+    minutes = 24*60
+    if len(sys.argv) > 1: actors = int(sys.argv[1])
+    if len(sys.argv) > 2: minutes = int(sys.argv[2])
+    print actors, 'actors,', minutes, 'minutes of game time'
+    for scheduler in (Scheduler, TurnScheduler):
+        updates, secs = run(scheduler, actors, minutes)
+        print '%-14s %8d updates %8.3f s' % (scheduler.__name__, updates,
+                                             secs)
+
+if __name__ == '__main__': main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+#   benchwheel.py -- time the queues a Scheduler can keep its times in
+#
+"""
+Time the queues a Scheduler can keep its event times in, by themselves:
+the times of 10k, 100k and 1M pending events -- most of them due within
+the next ten minutes, the rest spread over the next month -- are put in
+each queue, then the earliest time is taken and a later one added, over
+and over, as a Scheduler does when its events reschedule themselves.
+
+The queue only holds each time once, however many events are due then,
+so it's the number of distinct times that matters; each line says how
+many there were.  Performing the events isn't timed.
+
+    SortedTimes  -- the old dict+sort: sorts every time on each update
+    TimeHeap     -- the default
+    TimingWheel  -- for very busy worlds
+
+usage: python benchwheel.py [steps]
+"""
+
+import sys, time, random
+
+import pub
+from pub.pubcore import *
+
+class SortedTimes:
+    """
+    the times of events kept the way the Scheduler used to: in no
+    particular order, sorted whenever the earliest one is wanted
+    """
+    def __init__(self, pTimes=()):
+        self.times = list(pTimes)
+
+    def __len__(self):
+        return len(self.times)
+
+    def Push(self, pTime):
+        self.times.append(pTime)
+
+    def Pop(self):
+        self.times.sort()
+        return self.times.pop(0)
+
+def delays(pCount):
+    """
+    return pCount delays, in minutes, for the events to be scheduled
+    """
+    rand = random.Random(1)
+    out = []
+    for i in xrange(pCount):
+        if rand.random() < 0.9: out.append(rand.randint(0, 10))
+        else: out.append(rand.randint(0, 30*24*60))
+    return out
+
+def run(pQueue, pTimes, pDelays):
+    """
+    fill pQueue with pTimes, then take the earliest time and add it
+    again a delay later (unless that time is queued already), for each
+    of pDelays; return the seconds each part took
+    """
+    queued = {}
+    for t in pTimes: queued[t] = 1
+    start = time.time()
+    queue = pQueue()
+    for t in pTimes: queue.Push(t)
+    filled = time.time()
+    for delay in pDelays:
+        t = queue.Pop()
+        del queued[t]
+        t = t + delay
+        if not queued.has_key(t):
+            queued[t] = 1
+            queue.Push(t)
+    return filled - start, time.time() - filled
+
+def main():
+    steps = 10000
+    if len(sys.argv) > 1: steps = int(sys.argv[1])
+    print '%8s %8s %-12s %10s %10s' % ('events', 'times', 'queue',
+                                        'fill (s)', str(steps) + ' steps')
+    for count in (10000, 100000, 1000000):
+        times = {}
+        for delay in delays(count): times[720 + delay] = 1
+        times = times.keys()
+        random.Random(2).shuffle(times)
+        for queue in (SortedTimes, TimeHeap, TimingWheel):
+            fill, stepping = run(queue, times, delays(steps))
+            print '%8d %8d %-12s %10.3f %10.3f' % (count, len(times),
+                queue.__name__, fill, stepping)
+
+if __name__ == '__main__': main()
@@ -17,7 +17,8 @@
 #    Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 """
 Includes several in game verbs
-DbgContents, DbgExamine SetBreak and DbgPrompt 
+DbgContents, DbgExamine, DbgEvents, DbgStats (and DbgStatsOn, DbgStatsOff,
+DbgStatsSave), DbgSight, SetBreak and DbgPrompt
 
 Use this by adding 
 import debug
@@ -34,7 +35,7 @@ import code, sys
 # pub imports
 import pub
 from constants import OK, CANCEL
-from pubcore import Verb
+from pubcore import Verb, SchedulerStats
 import pubverbs 
 
 # protocols imports
@@ -101,6 +102,111 @@ pubverbs.dbgContents = DbgContents('@contents,@con')
 
 #----------------------------------------------------------------------
 
+class DbgEvents(pubverbs.Transitive):
+    """
+    @events: Print the scheduled events which refer to an object.
+    (for debugging)
+    """
+    def Finish(self,cmd):
+        print '\nEvents pending for', cmd.dirobj,'\n'
+        for event in pub.scheduler.PendingEventsFor(cmd.dirobj):
+            print event
+        print
+
+        return OK
+
+pubverbs.dbgEvents = DbgEvents('@events')
+
+#----------------------------------------------------------------------
+
+class DbgStats(Verb):
+    """
+    @stats: Print the statistics kept on the scheduler's events.
+    (for debugging)
+    '@stats-on' starts recording them and '@stats-off' stops it;
+    '@stats-save' writes what's been recorded to pubstats.txt.
+    """
+    def Finish(self,cmd):
+        if not pub.scheduler.stats:
+            print "Not recording scheduler statistics; try '@stats-on'."
+        else: print '\n' + pub.scheduler.stats.Report() + '\n'
+        return OK
+
+pubverbs.dbgStats = DbgStats('@stats')
+
+class DbgStatsOn(Verb):
+    """
+    @stats-on: Start keeping statistics on the scheduler's events.
+    (for debugging)
+    """
+    def Finish(self,cmd):
+        pub.scheduler.stats = SchedulerStats(pub.scheduler)
+        print 'Recording scheduler statistics.'
+        return OK
+
+pubverbs.dbgStatsOn = DbgStatsOn('@stats-on')
+
+class DbgStatsOff(Verb):
+    """
+    @stats-off: Stop keeping statistics on the scheduler's events.
+    (for debugging)
+    """
+    def Finish(self,cmd):
+        pub.scheduler.stats = None
+        print 'Scheduler statistics off.'
+        return OK
+
+pubverbs.dbgStatsOff = DbgStatsOff('@stats-off')
+
+class DbgStatsSave(Verb):
+    """
+    @stats-save: Write the scheduler's statistics to pubstats.txt.
+    (for debugging)
+    """
+    def Finish(self,cmd):
+        if not pub.scheduler.stats:
+            print "Not recording scheduler statistics; try '@stats-on'."
+            return OK
+        f = open('pubstats.txt', 'w')
+        f.write(pub.scheduler.stats.Report() + '\n')
+        f.close()
+        print 'Scheduler statistics written to pubstats.txt'
+        return OK
+
+pubverbs.dbgStatsSave = DbgStatsSave('@stats-save')
+
+#----------------------------------------------------------------------
+
+class DbgSight(Verb):
+    """
+    @sight: Show how often the rooms knew who could see what.
+    (for debugging)
+    Prints each room's SightCache hits and misses since it was
+    made, and the hit rate over them all.
+    """
+    def Finish(self,cmd):
+        rooms = [pub.universe] + pub.universe.VisibleContents()
+        rooms = filter(lambda x: hasattr(x,'ForgetSight') and x.sightcache,
+                       rooms)
+        hits = misses = 0
+        print
+        for room in rooms:
+            cache = room.sightcache
+            print '%-30s %6d hits %6d misses' % (room.GetName()[:30],
+                                                 cache.hits, cache.misses)
+            hits = hits + cache.hits
+            misses = misses + cache.misses
+        if hits + misses:
+            print 'total: %d hits, %d misses (%d%% hits)' % (hits, misses,
+                                    100 * hits / (hits + misses))
+        else: print 'No rooms have worked out who can see what yet.'
+        print
+        return OK
+
+pubverbs.dbgSight = DbgSight('@sight')
+
+#----------------------------------------------------------------------
+
 class DbgPrompt(Verb):
     """@prompt:
     Creates an interactive prompt from which we can check on our 
@@ -70,7 +70,7 @@ class ScriptPlayer(pubobjs.Actor):
         pubobjs.Actor.__init__(self,pNames)
         self.script = []
         self.curItem = 0
-        pub.scheduler.AddEvent(3,Event(self,'object.Play()'))
+        pub.scheduler.AddEvent(3,MethodEvent(self,'Play'))
 
     def Play(self):
         """
@@ -89,7 +89,7 @@ class ScriptPlayer(pubobjs.Actor):
             self.DoCommandString(command)
         else:
             self.Announce(item)
-        pub.scheduler.AddEvent(delay, Event(self,'object.Play()'))
+        pub.scheduler.AddEvent(delay, MethodEvent(self,'Play'))
 
 #----------------------------------------------------------------------
 #   Transceiver: when on, transmits to all others
@@ -109,8 +109,8 @@ class Transceiver(pubobjs.Switch):
         except:
             pub.transceiverList = [self]
         self.prefix = "On the transceiver: "
-        self.effectOnCode = "self.listening = 1"
-        self.effectOffCode = "self.listening = 0"
+        self.effectOnCode = "self.Set('listening', 1)"
+        self.effectOffCode = "self.Set('listening', 0)"
         self.effectOn = '<The dirobj> is now on.'
         self.effectOff = '<The dirobj> is now off.'
         self.oeffectOn = '<The actor> activates <the dirobj>.'
@@ -218,15 +218,15 @@ class Elevator(pubobjs.Room):
         else:
             t = self.busytill + 1
         if self.open:
-            pub.scheduler.AddAbsEvent(t, Event(self,'object.CloseDoors()'))
+            pub.scheduler.AddAbsEvent(t, MethodEvent(self,'CloseDoors'))
             t = t + 2
         if self.currentFloor != pButton.floor:
             pub.scheduler.AddAbsEvent(t, \
-                Event(self,'object.MoveByName("'+pButton.floor.name+'")') )
+                MethodEvent(self,'MoveByName',(pButton.floor.name,)) )
             t = t+1
-        pub.scheduler.AddAbsEvent(t, Event(self,'object.OpenDoors()'))
+        pub.scheduler.AddAbsEvent(t, MethodEvent(self,'OpenDoors'))
         t = t+5
-        pub.scheduler.AddAbsEvent(t, Event(self,'object.Idle()'))
+        pub.scheduler.AddAbsEvent(t, MethodEvent(self,'Idle'))
         self.busytill = t
         return
 
@@ -357,6 +357,7 @@ class Vehicle(pubobjs.Room):
         self.arrive = self(The) + " has arrived."
         self.oarrive = self(A) + " has arrived."
         self.goingTo = None
+        self.arriveEvent = None
         self.defverb = pubverbs.use
         self.size = 400
         self.opostsucc = '<The actor> enters <the dirobj>.'
@@ -376,7 +377,9 @@ class Vehicle(pubobjs.Room):
     def TravelTo(self, pWhere):
         self.Leave()
         self.goingTo = pWhere
-        pub.scheduler.AddEvent(10, Event(self,"object.Arrive()") )
+        if self.arriveEvent: pub.scheduler.Cancel(self.arriveEvent)
+        self.arriveEvent = MethodEvent(self,'Arrive')
+        pub.scheduler.AddEvent(10, self.arriveEvent)
     
     def Leave(self):        # cleanly move to self.route
         # close the window and exit
@@ -389,6 +392,7 @@ class Vehicle(pubobjs.Room):
         self.MoveTo(self.route)
     
     def Arrive(self):       # cleanly move to self.goingTo
+        self.arriveEvent = None
         self.MoveTo(self.goingTo)
         self.exit.open = 1
         # announce the arrival
@@ -118,7 +118,7 @@ the room is a raised stone pool filled with water.  To the north is a great \
 stone door, into which a gargoyle has been carved with amazingly lifelike \
 detail."
 pub.player.MoveTo(room)
-room.ownLight = 5
+room.Set('ownLight', 5)
 
 pool = pub.objs.Container("pool,fountain")
 pool.desc = "The pool is composed of circular stone walls about a foot \
@@ -148,7 +148,7 @@ garg.desc = "The gargoyle is carved into the door with amazing \
 three-dimensional relief.  Its face wears an exaggerated expression \
 of boredom.  Its hand juts out from the door, palm up."
 garg.salient = FALSE
-garg.light = 10
+garg.Set('light', 10)
 garg.note = 'The gargoyle on the door glows faintly in the dark, as \
 magical items frequently do.'
 
@@ -161,8 +161,8 @@ garg.door = door
 lamp = pub.objs.Switch('lamp')
 lamp.onDesc = 'The lamp is glowing brightly.'
 lamp.offDesc = 'The lamp is dark.'
-lamp.effectOnCode = 'self.light = 40'
-lamp.effectOffCode = 'self.light = 0'
+lamp.effectOnCode = "self.Set('light', 40)"
+lamp.effectOffCode = "self.Set('light', 0)"
 lamp.effectOn = "You turn on the lamp, and it glows brightly."
 lamp.oeffectOn = "<The actor> activates the lamp, which glows brightly."
 lamp.effectOff = "You turn off the lamp."
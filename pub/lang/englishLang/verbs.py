@@ -139,7 +139,7 @@ class EnglishVerb:
 
         if cmd.actor.busytill > pub.scheduler.minutes:
             pub.scheduler.AddAbsEvent(cmd.actor.busytill, \
-                                      pub.Event(self, 'object.begin(cmd)',cmd) )
+                                      pub.MethodEvent(self, 'begin', (cmd,), cmd) )
             return
         # if actor is not busy, then begin command immediatly
         if self.begin(cmd): cmd.tell()
@@ -103,16 +103,21 @@ def cleanupsaves(filelist, maxage = 86400):
 
 class CGIPlayer(pubobjs.Actor):
 
+    recorded = TRUE
+
     def __init__(self,pNames):
         pubobjs.Actor.__init__(self,pNames)
         self.inbuf = []
         self.outbuf = []
+        self.sleeping = TRUE
 
     def Tell(self, pWhat):
         self.outbuf.append( "<p>" + pWhat + "</p>" + "\n" )
 
     def Act(self):
+        # (unless a command gets started, sleep until HandleMsg wakes us)
         if pub.scheduler.HasEventFor( self ): 
+            self.sleeping = TRUE
             return
         # no scheduled events, so check for a command in the buffer
         if len(self.inbuf):
@@ -124,11 +129,14 @@ class CGIPlayer(pubobjs.Actor):
             elif words[0]=='save': self.Save()
             elif words[0]=='restore': self.Restore(words)
             else: self.DoCommandString(cmdstr)
-        else: pub.scheduler.AddEvent( 1, Event(self, 'object.Act()') )
+        if not pub.scheduler.HasEventFor( self ):
+            self.sleeping = TRUE
+            if self.inbuf: self.Wake()  # (that one came to nothing)
 
     def HandleMsg(self,msg):
         # place the message in the inbuf, for later use
         self.inbuf.append(msg)
+        self.Wake()
 
     def Quit(self):
         """
@@ -219,8 +227,6 @@ def handle_request(savedir, title='PUB',
     form = cgi.FieldStorage()
     command = form.getvalue('command','')
     if command: pub.player.HandleMsg(command)         
-        
-    pub.scheduler.AddEvent( 0, pub.Event(pub.player, 'object.Act()') ) 
 
     # there is probably a better way to handle this
     # once I learn more about the scheduler?
@@ -56,6 +56,9 @@ import types
 import copy
 import random
 import re
+import heapq
+import bisect
+import time
 
 # pub imports
 
@@ -152,10 +155,51 @@ def restoregame(filename='pub.dat', quiet=FALSE):
             print '  Error:', filename, "doesn't exist or is not readable."
             print '  Aborting!'
         return CANCEL
-    picklemod.restore(f, pubverbs, pub, sys.modules['__main__'])
+    pub.restoring = TRUE    # (rooms unpickled mustn't become lastroom)
+    try: picklemod.restore(f, pubverbs, pub, sys.modules['__main__'])
+    finally: pub.restoring = FALSE
     f.close()
     if not quiet: print '  Game', filename, 'restored'
 
+class NullOutput:
+    """
+    a file-like object which throws away whatever is written to it
+    """
+    def write(self, pStr): pass
+    def flush(self): pass
+
+def fastforward(untiltime=None, maxevents=None):
+    """
+    Run the world without a player, as fast as it will go.
+
+    Updates pub.scheduler until the clock reaches untiltime (in minutes),
+    maxevents events have been performed, the game stops or there is
+    nothing left to do.  Anything printed meanwhile is thrown away.
+    Returns the number of events performed and the seconds it took.
+    """
+    import sys
+    import time
+
+    scheduler = pub.scheduler
+    performed = scheduler.performed
+    stdout = sys.stdout
+    sys.stdout = NullOutput()
+    start = time.time()
+    try:
+        while pub.gameStatus == RUNNING:
+            nexttime = scheduler.NextTime()
+            if nexttime is None: break
+            if untiltime is not None and nexttime > untiltime: break
+            left = None         # events still allowed
+            if maxevents is not None:
+                left = maxevents - (scheduler.performed - performed)
+                if left <= 0: break
+            try: scheduler.Update(left)
+            except pub.errors.BailOutError: pass
+    finally:
+        sys.stdout = stdout
+    return scheduler.performed - performed, time.time() - start
+
 #--------------------------------------------------------------------
 # chainLinker -- Used by the component driven object system
 #
@@ -308,8 +352,14 @@ class Event:
 
         Basically you load code into it. If 'Perform'ed, it
         executes the code.
+
+        Once cancelled (see Scheduler.Cancel) it won't be performed.
     """
 
+    cancelled = FALSE
+    codecache = {}      # event source string -> compiled code object;
+                        # kept on the class so saved games don't carry it
+
     def __init__(self,pObject=None,pCode=None,pCmd=None):
         if not pObject: return    # must be unpickling
         self.object = pObject
@@ -326,17 +376,333 @@ class Event:
     def Perform(self):
         """
         execute the code in self.code
+
+        the code is compiled only once for each distinct source string
+        (see codecache), not every time an event is performed
         """
 #       print 'Performing: ' + str(self)
         object = self.object
         cmd = self.cmd
-        exec self.code
+        codecache = Event.codecache
+        try: code = codecache[self.code]
+        except KeyError:
+            if len(codecache) >= MAXEVENTCODE: codecache.clear()
+            code = compile(self.code, '<event>', 'exec')
+            codecache[self.code] = code
+        exec code
 
     def RefersTo(self,pWhom):
         if self.object == pWhom or \
         self.cmd and self.cmd.actor == pWhom: return TRUE
         return FALSE
 
+    def Kind(self):
+        """
+        return what sort of event this is, for SchedulerStats
+        """
+        return string.join(string.split(str(self.code)))
+
+    def Referents(self):
+        """
+        return the objects this event refers to (see RefersTo)
+        """
+        if self.cmd and self.cmd.actor != self.object:
+            return [self.object, self.cmd.actor]
+        return [self.object]
+
+MAXEVENTCODE = 1000     # start over when this many sources are cached
+
+#----------------------------------------------------------------------
+# method event -- an event which calls a method of its object
+#
+class MethodEvent(Event):
+    """
+    MethodEvent:
+        an Event which calls one of its object's methods when it's 
+        'Perform'ed, without going through exec.
+
+        MethodEvent(npc, 'Act') does the same as Event(npc, 'object.Act()')
+        and MethodEvent(elevator, 'MoveByName', ('lobby',)) the same as
+        Event(elevator, 'object.MoveByName("lobby")').
+
+        Only the method's name is kept, so these pickle just like
+        Events do.
+    """
+
+    def __init__(self,pObject=None,pMethod=None,pArgs=(),pCmd=None):
+        if not pObject: return    # must be unpickling
+        Event.__init__(self,pObject,None,pCmd)
+        self.method = pMethod
+        self.args = tuple(pArgs)
+
+    def __str__(self):
+        """
+        prints a MethodEvent and the call it will make
+        """
+        call = 'object.' + self.method + '(' \
+             + string.join(map(repr, self.args), ', ') + ')'
+        return '< Event: ' + str(self.object) + ',' + call + ' >'
+
+    def Perform(self):
+        """
+        call the method
+        """
+        apply(getattr(self.object, self.method), self.args)
+
+    def Kind(self):
+        return self.object.__class__.__name__ + '.' + self.method
+
+#----------------------------------------------------------------------
+# TimeHeap -- the times of pending events, earliest first
+#
+class TimeHeap:
+    """
+    TimeHeap:
+        the queue of event times used by a Scheduler by default.
+
+        A binary heap, so adding a time and taking the earliest one
+        are both O(log n).  Any queue class with the same methods can
+        be given to a Scheduler instead (see TimingWheel).
+    """
+    def __init__(self, pTimes=()):
+        self.times = list(pTimes)
+        heapq.heapify(self.times)
+
+    def __len__(self):
+        return len(self.times)
+
+    def Push(self, pTime):
+        """
+        add a time; it must not be in the queue already
+        """
+        heapq.heappush(self.times, pTime)
+
+    def Pop(self):
+        """
+        remove and return the earliest time
+        """
+        return heapq.heappop(self.times)
+
+    def Peek(self):
+        """
+        return the earliest time, leaving it in the queue
+        """
+        return self.times[0]
+
+#----------------------------------------------------------------------
+# TimingWheel -- a faster queue of event times for busy worlds
+#
+WHEELSIZE = 256     # slots in each wheel of a TimingWheel
+
+class TimingWheel:
+    """
+    TimingWheel:
+        a queue of event times like TimeHeap, for worlds with lots of
+        pending events, most of them due within the next few minutes.
+
+        The fine wheel has a slot for each minute of the current block
+        of WHEELSIZE minutes; the coarse wheel has a slot for each of
+        the next WHEELSIZE-1 blocks, which is emptied into the fine
+        wheel when the clock reaches it.  So adding and taking near
+        times doesn't depend on how many are queued.  Times beyond the
+        coarse wheel (or before the last one taken) go in a heap.
+
+        The fine slot of the earliest time is kept once found, so each
+        slot of a block is looked at no more than once.  Empty wheels
+        move on to a time too far ahead for them, so a long jump of
+        the clock doesn't leave every later time in the heap.
+    """
+    def __init__(self, pTimes=()):
+        self.now = 0                        # last time taken from the wheels
+        self.block = 0                      # block held by the fine wheel
+        self.fine = [None] * WHEELSIZE      # a time, or None
+        self.coarse = [None] * WHEELSIZE    # a list of times, or None
+        self.finecount = 0
+        self.coarsecount = 0
+        self.head = None                    # slot of the earliest fine time,
+                                            # if known
+        self.overflow = []                  # heap of all other times
+        for time in pTimes: self.Push(time)
+
+    def __len__(self):
+        return self.finecount + self.coarsecount + len(self.overflow)
+
+    def Push(self, pTime):
+        """
+        add a time; it must not be in the queue already
+        """
+        if type(pTime) == types.IntType:
+            if not self.finecount and not self.coarsecount and \
+               (pTime < self.now or
+                pTime / WHEELSIZE - self.block >= WHEELSIZE) and \
+               (not self.overflow or pTime <= self.overflow[0]):
+                self.MoveTo(pTime)      # (the wheels are empty)
+            if pTime >= self.now:
+                block = pTime / WHEELSIZE
+                if block == self.block:
+                    slot = pTime % WHEELSIZE
+                    self.fine[slot] = pTime
+                    if not self.finecount: self.head = slot
+                    elif self.head is not None and slot < self.head:
+                        self.head = slot
+                    self.finecount = self.finecount + 1
+                    return
+                if block - self.block < WHEELSIZE:
+                    slot = self.coarse[block % WHEELSIZE]
+                    if slot is None: self.coarse[block % WHEELSIZE] = [pTime]
+                    else: slot.append(pTime)
+                    self.coarsecount = self.coarsecount + 1
+                    return
+        heapq.heappush(self.overflow, pTime)
+
+    def Pop(self):
+        """
+        remove and return the earliest time
+        """
+        time = self.Next()
+        if self.overflow and (time is None or self.overflow[0] < time):
+            if time is None and type(self.overflow[0]) == types.IntType:
+                self.MoveTo(self.overflow[0])   # (the wheels are empty)
+            return heapq.heappop(self.overflow)
+        self.fine[self.head] = None
+        self.finecount = self.finecount - 1
+        self.head = None
+        self.now = time
+        return time
+
+    def Peek(self):
+        """
+        return the earliest time, leaving it in the queue
+        """
+        time = self.Next()
+        if self.overflow and (time is None or self.overflow[0] < time):
+            return self.overflow[0]
+        return time
+
+    def Next(self):
+        """
+        return the earliest time in the wheels (not the overflow heap),
+        turning them as far as needed to bring it into the fine wheel
+        """
+        while TRUE:
+            if self.finecount:
+                if self.head is None:
+                    slot = self.now % WHEELSIZE
+                    while self.fine[slot] is None: slot = slot + 1
+                    self.head = slot
+                return self.fine[self.head]
+            if not self.coarsecount: return None
+            # fine wheel is empty, so move on to the next block in use
+            block = self.block + 1
+            while self.coarse[block % WHEELSIZE] is None: block = block + 1
+            times = self.coarse[block % WHEELSIZE]
+            self.coarse[block % WHEELSIZE] = None
+            self.coarsecount = self.coarsecount - len(times)
+            self.block = block
+            self.now = block * WHEELSIZE
+            for time in times: self.fine[time % WHEELSIZE] = time
+            self.finecount = len(times)
+            self.head = min(times) % WHEELSIZE
+
+    def MoveTo(self, pTime):
+        """
+        move the empty wheels so that the fine one holds pTime's block
+        """
+        self.block = pTime / WHEELSIZE
+        self.now = self.block * WHEELSIZE
+        self.head = None
+
+#----------------------------------------------------------------------
+# SchedulerStats -- where the time goes, for a Scheduler which wants to know
+#
+LATENCIES = (0.0001, 0.001, 0.01, 0.1)   # histogram bounds, in seconds
+
+class SchedulerStats:
+    """
+    SchedulerStats:
+        records, while a Scheduler's 'stats' is set to one of these, the
+        wall-clock time taken by each kind of event (see Event.Kind),
+        the number of events pending after each update and the number
+        of events performed in each game minute.
+
+        With 'stats' left as None the Scheduler doesn't time anything.
+        The @stats-on and @stats-off debug verbs start and stop this,
+        and @stats prints Report().
+    """
+    def __init__(self, pScheduler):
+        self.start = pScheduler.GetTime()
+        self.kinds = {}     # kind -> [count, total secs, max secs, histogram]
+        self.depthmin = None    # events pending after each update:
+        self.depthmax = 0       # least, most
+        self.depthsum = 0       # and total (over self.updates)
+        self.perminute = {} # game minute -> events performed
+        self.updates = 0
+        self.seconds = 0.0
+
+    def Perform(self, pScheduler, pEventList):
+        """
+        perform the events of one update, timing each one
+        """
+        began = time.time()
+        performed = 0
+        for e in pEventList:
+            if e.cancelled: continue
+            start = time.time()
+            e.Perform()
+            self.Note(e.Kind(), time.time() - start)
+            performed = performed + 1
+        self.seconds = self.seconds + time.time() - began
+        self.updates = self.updates + 1
+        minute = pScheduler.minutes
+        self.perminute[minute] = self.perminute.get(minute, 0) + performed
+        depth = pScheduler.livecount
+        if self.depthmin is None or depth < self.depthmin: self.depthmin = depth
+        if depth > self.depthmax: self.depthmax = depth
+        self.depthsum = self.depthsum + depth
+
+    def Note(self, pKind, pSecs):
+        """
+        add the time taken by an event of kind pKind
+        """
+        if not self.kinds.has_key(pKind):
+            self.kinds[pKind] = [0, 0.0, 0.0, [0] * (len(LATENCIES) + 1)]
+        kind = self.kinds[pKind]
+        kind[0] = kind[0] + 1
+        kind[1] = kind[1] + pSecs
+        if pSecs > kind[2]: kind[2] = pSecs
+        bucket = 0
+        while bucket < len(LATENCIES) and pSecs >= LATENCIES[bucket]:
+            bucket = bucket + 1
+        kind[3][bucket] = kind[3][bucket] + 1
+
+    def Report(self):
+        """
+        return the statistics as text
+        """
+        events = reduce(lambda x,y: x + y[0], self.kinds.values(), 0)
+        out = ['Scheduler statistics since ' + self.start,
+               '%d events in %d updates, %.3f seconds' % \
+               (events, self.updates, self.seconds), '',
+               '%-32s %7s %9s %8s %8s  %s' % ('event', 'count', 'total ms',
+               'mean ms', 'max ms', '<0.1ms <1ms <10ms <100ms more')]
+        kinds = map(lambda x: (x[1][1], x[0], x[1]), self.kinds.items())
+        kinds.sort()
+        kinds.reverse()
+        for total, name, kind in kinds:
+            out.append('%-32s %7d %9.2f %8.3f %8.3f  %s' % (name[:32], 
+                kind[0], total * 1000, total * 1000 / kind[0], 
+                kind[2] * 1000, string.join(map(str, kind[3]), ' ')))
+        if self.updates:
+            out.append('')
+            out.append('events pending: min %d, mean %.1f, max %d' % \
+                (self.depthmin, float(self.depthsum) / self.updates,
+                 self.depthmax))
+        if self.perminute:
+            busiest = max(map(lambda x: (x[1], x[0]), self.perminute.items()))
+            out.append('events per game minute: mean %.1f, max %d' % \
+                (float(events) / len(self.perminute), busiest[0]))
+        return string.join(out, '\n')
+
 #----------------------------------------------------------------------
 # scheduler -- keeps track of the world clock, calls events, etc.
 #
@@ -358,13 +724,25 @@ class Scheduler:
         for some reason it always take an extra minute for an action.
         could be a problem since we don't have any 12:01, 12:03 and
         so forth.
+
+        The times which have events are kept in a TimeHeap; a game
+        can pass another queue class, such as TimingWheel.
     """
+    queueclass = TimeHeap
+    performed = 0           # events performed so far
+    stats = None            # a SchedulerStats, if we're keeping statistics
+
     # initialization method
-    def __init__(self,pTimeString='12:00'):
+    def __init__(self,pTimeString='12:00',pQueue=None):
         timeparts = string.split(pTimeString,':')
         self.minutes = string.atoi(timeparts[0])*60 \
                        + string.atoi(timeparts[1])
-        self.events = {}
+        if pQueue: self.queueclass = pQueue
+        self.events = {}        # time -> list of events due at that time
+        self.eventtimes = self.queueclass()  # times used as keys in events
+        self.eventsfor = {}     # object -> list of its pending events
+        self.deadcount = 0      # cancelled events still in self.events
+        self.livecount = 0      # and the ones which will be performed
     
     def __str__(self):
         """
@@ -374,6 +752,38 @@ class Scheduler:
         return '< Scheduler at time ' + self.GetTime() \
                 + ' and ' + str(len(self.events)) + ' events >'
 
+    def __getstate__(self):
+        """
+        the queue and the index are derived from self.events, so leave
+        them out of saved games; that keeps them loadable by (and from) 
+        older versions
+        """
+        if self.deadcount: self.Compact()
+        state = self.__dict__.copy()
+        del state['eventtimes']
+        del state['eventsfor']
+        del state['deadcount']
+        del state['livecount']
+        if state.has_key('stats'): del state['stats']
+        return state
+
+    def __setstate__(self, state):
+        """
+        restore a pickled scheduler and rebuild the queue of event times
+        and the index of events by object
+        """
+        self.__dict__.update(state)
+        self.eventtimes = self.queueclass(self.events.keys())
+        self.eventsfor = {}
+        self.deadcount = 0
+        self.livecount = 0
+        for eventlist in self.events.values():
+            for e in eventlist: 
+                if e.cancelled: self.deadcount = self.deadcount + 1
+                else:
+                    self.livecount = self.livecount + 1
+                    self.IndexEvent(e)
+
     def GetTime(self):
         """
         Get the time of day
@@ -384,7 +794,14 @@ class Scheduler:
         if day: return "%d:%02d (Day %s)" % (hour,minute,day)
         return "%d:%02d" % (hour,minute)
 
+    def GetClock(self):
+        """
+        Get what a clock in the game reads (for <time> in messages)
+        """
+        return string.split(self.GetTime())[0]
+
     def AddAbsEvent(self,pAbsTime,pEvent):
+        if pEvent.cancelled: self.Revive(pEvent)
         if pAbsTime < self.minutes:
             print "WARNING: scheduling event for a past time"
             self.minutes = pAbsTime
@@ -392,6 +809,9 @@ class Scheduler:
             self.events[pAbsTime].append(pEvent)
         else:
             self.events[pAbsTime] = [pEvent]
+            self.eventtimes.Push(pAbsTime)
+        self.livecount = self.livecount + 1
+        self.IndexEvent(pEvent)
     
     def AddEvent(self,pRelTime,pEvent):
         """AddEvent:
@@ -401,37 +821,215 @@ class Scheduler:
         self.AddEvent(5, event) will add a new event 5 minutes from now. 
         
         """
+        if pEvent.cancelled: self.Revive(pEvent)
         time = int(self.minutes) + int(pRelTime)
         if self.events.has_key(time):
             self.events[time].append(pEvent)
-        else: self.events[time] = [pEvent]
+        else: 
+            self.events[time] = [pEvent]
+            self.eventtimes.Push(time)
+        self.livecount = self.livecount + 1
+        self.IndexEvent(pEvent)
 
-    def Update(self):
+    def IndexEvent(self, pEvent):
         """
-        update the scheduler
+        note a newly scheduled event under each object it refers to
+        """
+        for obj in pEvent.Referents():
+            if self.eventsfor.has_key(obj):
+                self.eventsfor[obj].append(pEvent)
+            else: self.eventsfor[obj] = [pEvent]
+
+    def UnindexEvent(self, pEvent):
+        """
+        forget an event which is no longer pending
+        """
+        for obj in pEvent.Referents():
+            pending = self.eventsfor[obj]
+            pending.remove(pEvent)
+            if not pending: del self.eventsfor[obj]
+
+    def Cancel(self, pEvent):
+        """
+        cancel an event, so that it won't be performed.
+
+        The event is only marked as cancelled; it stays where it is in 
+        the queue until Update gets to it or there are enough cancelled 
+        events to make a Compact worthwhile.
         """
-        if not self.events: return
-        eventkeys = self.events.keys()        # get event times
-        eventkeys.sort()            # sort them
-        nexteventkey = eventkeys[0]        # find earliest time
+        pending = self.eventsfor.get(pEvent.Referents()[0], [])
+        count = pending.count(pEvent)
+        for i in range(count): self.UnindexEvent(pEvent)
+        pEvent.cancelled = TRUE
+        self.deadcount = self.deadcount + count
+        self.livecount = self.livecount - count
+        if self.deadcount > MINCOMPACT and self.deadcount > self.livecount:
+            self.Compact()
+
+    def CancelFor(self, pFor):
+        """
+        cancel all pending events which refer to an object
+        """
+        for event in self.PendingEventsFor(pFor): self.Cancel(event)
+
+    def Revive(self, pEvent):
+        """
+        make a cancelled event schedulable again.  Cancelled copies of 
+        it which are still queued have to go first.
+        """
+        if self.deadcount: self.Compact()
+        pEvent.cancelled = FALSE
+
+    def Compact(self):
+        """
+        remove all cancelled events from the queue
+        """
+        for time, eventlist in self.events.items():
+            eventlist = filter(lambda x: not x.cancelled, eventlist)
+            if eventlist: self.events[time] = eventlist
+            else: del self.events[time]
+        self.eventtimes = self.queueclass(self.events.keys())
+        self.deadcount = 0
+
+    def NextTime(self):
+        """
+        return the time of the next events to be performed, or None
+        if there are none.  Times with only cancelled events left are
+        dropped on the way.
+        """
+        while self.events:
+            time = self.eventtimes.Peek()
+            if not self.deadcount: return time
+            eventlist = self.events[time]
+            if filter(lambda x: not x.cancelled, eventlist): return time
+            self.eventtimes.Pop()
+            del self.events[time]
+            self.deadcount = self.deadcount - len(eventlist)
+        return None
+
+    def Update(self, pMax=None):
+        """
+        update the scheduler
+
+        The times in self.events are kept in a queue, so finding the
+        earliest one doesn't mean sorting all of them on every update.
+        Times which only have cancelled events left are skipped.
+
+        If pMax is given, at most that many events are performed; the
+        rest of those due stay first in the queue.
+        """
+        eventlist = []
+        while not eventlist:
+            if not self.events: return
+            nexteventkey = self.eventtimes.Pop()  # find earliest time
+            eventlist = self.events[nexteventkey]
+            del self.events[nexteventkey]        # remove from the queue
+            if self.deadcount:
+                live = filter(lambda x: not x.cancelled, eventlist)
+                self.deadcount = self.deadcount - len(eventlist) + len(live)
+                eventlist = live
+        if pMax is not None and len(eventlist) > pMax:
+            self.events[nexteventkey] = eventlist[pMax:]
+            self.eventtimes.Push(nexteventkey)
+            eventlist = eventlist[:pMax]
         self.minutes = nexteventkey        # update clock
-        eventlist = self.events[nexteventkey]
-        del self.events[nexteventkey]        # remove from the queue
+        self.livecount = self.livecount - len(eventlist)
+        self.performed = self.performed + len(eventlist)
+        for e in eventlist: self.UnindexEvent(e)
+        if self.stats: return self.stats.Perform(self, eventlist)
         for e in eventlist:
             # print '[' + self.GetTime() + '] ',
-            e.Perform()            # perform scheduled events
+            if not e.cancelled: e.Perform()    # perform scheduled events
 
     def HasEventFor(self, pFor):
         """
         see if the scheduler has an event for a certain object,
         pass this method a game object.
         """
-        if not self.events: return FALSE
-        for eventlist in self.events.values():
-            if filter(lambda x,a=pFor: x.RefersTo(a), eventlist):
-                return TRUE
+        if self.eventsfor.has_key(pFor): return TRUE
         return FALSE
 
+    def PendingEventsFor(self, pFor):
+        """
+        return a list of the pending events which refer to an object
+        """
+        return self.eventsfor.get(pFor, [])[:]
+
+MINCOMPACT = 100    # cancelled events allowed before the queue is compacted
+
+#----------------------------------------------------------------------
+# TurnScheduler -- a scheduler which counts turns instead of minutes
+#
+class TurnScheduler(Scheduler):
+    """
+    TurnScheduler:
+        same interface as Scheduler, but counts turns instead of
+        telling the time of day.
+
+        Each Update is one turn: all events due in it are performed
+        as one batch, and anything scheduled for 'now' while the batch
+        runs goes into the next turn rather than into a second pass
+        of this one.  As with Scheduler, turns with nothing scheduled
+        are jumped over in one step.  It only changes how the clock
+        counts; it does no less work than Scheduler.
+
+        Use TakeOver to switch a game which made its own Scheduler.
+    """
+    def __init__(self,pTimeString='12:00',pQueue=None):
+        Scheduler.__init__(self,pTimeString,pQueue)
+        self.start = self.minutes   # turn 0
+        self.performing = FALSE     # in the middle of a turn?
+
+    def __str__(self):
+        return '< TurnScheduler at ' + self.GetTime() \
+                + ' and ' + str(len(self.events)) + ' events >'
+
+    def __getstate__(self):
+        state = Scheduler.__getstate__(self)
+        del state['performing']
+        return state
+
+    def __setstate__(self, state):
+        Scheduler.__setstate__(self, state)
+        self.performing = FALSE
+
+    def TakeOver(self, pScheduler):
+        """
+        take over the clock and pending events of another scheduler
+        """
+        self.__setstate__(pScheduler.__getstate__())
+        self.start = self.minutes
+        return self
+
+    def GetTurn(self):
+        """
+        return the number of turns since the game started
+        """
+        return int(self.minutes) - self.start
+
+    def GetTime(self):
+        return 'turn ' + str(self.GetTurn())
+
+    def GetClock(self):
+        return self.GetTime()
+
+    def AddAbsEvent(self,pAbsTime,pEvent):
+        if self.performing and pAbsTime <= self.minutes:
+            pAbsTime = int(self.minutes) + 1
+        Scheduler.AddAbsEvent(self,pAbsTime,pEvent)
+
+    def AddEvent(self,pRelTime,pEvent):
+        self.AddAbsEvent(int(self.minutes) + int(pRelTime),pEvent)
+
+    def Update(self, pMax=None):
+        """
+        perform the events of the next turn which has any
+        """
+        performing = self.performing
+        self.performing = TRUE
+        try: Scheduler.Update(self, pMax)
+        finally: self.performing = performing
+
 #----------------------------------------------------------------------
 #    Command -- stores references for variarious parts of a command
 #
@@ -497,41 +1095,11 @@ class Command:
         """
         if string.find(pStr,'<') < 0 or string.find(pStr,'>') < 0:
             return pStr
-        str = pStr.replace('<actor>',self.actor(0,pFor))
-        str = str.replace('<Actor>',cap(self.actor(0,pFor)))
-        str = str.replace('<The actor>',self.actor(The,pFor))
-        str = str.replace('<the actor>',self.actor(the,pFor))
-        str = str.replace('<A actor>',self.actor(A,pFor))
-        str = str.replace('<a actor>',self.actor(a,pFor))
-
-        if isInstance(self.dirobj):
-            str = str.replace('<dirobj>',self.dirobj(0,pFor))
-            str = str.replace('<Dirobj>',cap(self.dirobj(0,pFor)))
-            str = str.replace('<The dirobj>',self.dirobj(The,pFor))
-            str = str.replace('<the dirobj>',self.dirobj(the,pFor))
-            str = str.replace('<A dirobj>',self.dirobj(A,pFor))
-            str = str.replace('<a dirobj>',self.dirobj(a,pFor))
-#           else: print "dirobj not an instance"
-
-        if isInstance(self.inobj):
-            str = str.replace('<inobj>',self.inobj(0,pFor))
-            str = str.replace('<Inobj>',cap(self.inobj(0,pFor)))
-            str = str.replace('<The inobj>',self.inobj(The,pFor))
-            str = str.replace('<the inobj>',self.inobj(the,pFor))
-            str = str.replace('<A inobj>',self.inobj(A,pFor))
-            str = str.replace('<a inobj>',self.inobj(a,pFor))
-
-        if isInstance(self.toobj):
-            str = str.replace('<toobj>',self.toobj(0,pFor))
-            str = str.replace('<Toobj>',cap(self.toobj(0,pFor)))
-            str = str.replace('<The toobj>',self.toobj(The,pFor))
-            str = str.replace('<the toobj>',self.toobj(the,pFor))
-            str = str.replace('<A toobj>',self.toobj(A,pFor))
-            str = str.replace('<a toobj>',self.toobj(a,pFor))
-
-        str = str.replace('<time>',string.split(pub.scheduler.GetTime())[0])
-
-        return str
+        tmpl = templates.Get(pStr)
+        if tmpl is None:
+            tmpl = Template(pStr)
+            templates.Put(pStr,tmpl)
+        return tmpl.Fill(self,pFor)
 
     def Tell(self, pToActor='', pToOthers='', pToThird='', pWhoIsThird=None ):
         """
@@ -556,11 +1124,360 @@ class Command:
         if pToThird and pWhoIsThird.listening:
             pWhoIsThird.Tell( self.StuffString(pToThird,pWhoIsThird) )
         if pToOthers:
-            for item in self.actor.LocalNouns():
+            for item in self.actor.LocalListeners():
                 if item != self.actor and item != self.actor.container \
                 and item != pWhoIsThird and item.listening:
                     item.Tell( self.StuffString(pToOthers,item) )
 
+#----------------------------------------------------------------------
+#    Lexicon -- a list of words which knows quickly what's in it
+#
+class Lexicon(list):
+    """
+    Lexicon:
+            a list of words (verbs, nouns etc.) which also keeps them in
+            a dictionary, so 'word in lexicon' doesn't search the list.
+
+            It's still a list, so game code can append to it as before.
+            Every change adds one to 'version', so anything built from
+            a lexicon can tell when it's out of date (see lexversion);
+            'reordered' is the version at which it last changed other 
+            than by adding words at the end.
+            Add registers a word only if it's new, keeping the list in
+            order if keepsorted is set.
+    """
+
+    def __init__(self, pWords=(), keepsorted=FALSE):
+        list.__init__(self, pWords)
+        self.keepsorted = keepsorted
+        if keepsorted: list.sort(self)
+        self.Recount()
+
+    def Recount(self):
+        """
+        rebuild the dictionary of words from the list
+        """
+        self.counts = {}
+        for word in self: self.counts[word] = self.counts.get(word, 0) + 1
+        self.version = getattr(self, 'version', 0) + 1
+        self.reordered = self.version
+
+    def __contains__(self, pWord):
+        try: return self.counts.has_key(pWord)
+        except TypeError: return list.__contains__(self, pWord)
+
+    def Add(self, pWord):
+        """
+        add a word, unless it's there already
+        """
+        if self.counts.has_key(pWord): return
+        # (not insort, which would call our insert, and so Recount)
+        if self.keepsorted: list.insert(self, bisect.bisect(self, pWord), pWord)
+        else: list.append(self, pWord)
+        self.counts[pWord] = 1
+        self.version = self.version + 1
+        if self.keepsorted: self.reordered = self.version
+
+    def append(self, pWord):
+        list.append(self, pWord)
+        self.counts[pWord] = self.counts.get(pWord, 0) + 1
+        self.version = self.version + 1
+
+    def remove(self, pWord):
+        list.remove(self, pWord)
+        if self.counts[pWord] > 1: self.counts[pWord] = self.counts[pWord] - 1
+        else: del self.counts[pWord]
+        self.version = self.version + 1
+        self.reordered = self.version
+
+    # anything else which changes the list just starts over
+    def extend(self, pWords):
+        list.extend(self, pWords)
+        self.Recount()
+
+    def insert(self, pIndex, pWord):
+        list.insert(self, pIndex, pWord)
+        self.Recount()
+
+    def pop(self, *pArgs):
+        word = list.pop(self, *pArgs)
+        self.Recount()
+        return word
+
+    def __setitem__(self, pIndex, pWord):
+        list.__setitem__(self, pIndex, pWord)
+        self.Recount()
+
+    def __delitem__(self, pIndex):
+        list.__delitem__(self, pIndex)
+        self.Recount()
+
+    def __setslice__(self, i, j, pWords):
+        list.__setslice__(self, i, j, pWords)
+        self.Recount()
+
+    def __delslice__(self, i, j):
+        list.__delslice__(self, i, j)
+        self.Recount()
+
+    def __iadd__(self, pWords):
+        self.extend(pWords)
+        return self
+
+    def __imul__(self, pTimes):
+        list.__imul__(self, pTimes)
+        self.Recount()
+        return self
+
+def lexversion():
+    """
+    return something which changes whenever any of the parser's lexicons
+    (verbs, nouns etc.) do
+    """
+    return (verbs.version, nouns.version, adverbs.version, conjs.version,
+            preps.version, garbs.version)
+
+#----------------------------------------------------------------------
+#    NounTrie -- the nouns, word by word, for finding the longest one
+#
+class NounTrie:
+    """
+    NounTrie:
+            the nouns, split into words and kept as a tree of
+            dictionaries, so that the longest noun at the start of some
+            words can be found without looking at every noun.
+
+            A noun matches if the words, joined up, start with it (so
+            'fish bucket' matches "fish buckets"), as the parser has 
+            always done.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.count = 0      # how many of the nouns list we've added
+        self.version = 0    # and the list's version when we did
+
+    def Add(self, pNoun):
+        """
+        add a noun
+        """
+        node = self.root
+        for word in string.split(pNoun):
+            if not node.has_key(word): node[word] = {}
+            node = node[word]
+        node[None] = TRUE     # a noun ends here
+
+    def Update(self, pNouns):
+        """
+        add whatever has been added to the Lexicon pNouns since last 
+        time (or start over, if it has changed in any other way)
+        """
+        if pNouns.version == self.version: return
+        if pNouns.reordered > self.version: self.__init__()
+        for noun in pNouns[self.count:]: self.Add(noun)
+        self.count = len(pNouns)
+        self.version = pNouns.version
+
+    def Longest(self, pWords, pStart=0):
+        """
+        return the number of words in the longest noun which pWords
+        start with (from pStart on), or 0 if there's none
+        """
+        node = self.root
+        longest = 0
+        for i in xrange(pStart, len(pWords)):
+            word = pWords[i]
+            # a noun may end with just the start of this word
+            for end in range(1, len(word)):
+                part = node.get(word[:end])
+                if part and part.has_key(None):
+                    longest = i - pStart + 1
+                    break
+            node = node.get(word)
+            if node is None: break
+            if node.has_key(None): longest = i - pStart + 1
+        return longest
+
+#----------------------------------------------------------------------
+#    ParseCache -- remembers what the parser made of recent strings
+#
+class ParseCache:
+    """
+    ParseCache:
+            what recent strings were parsed into (see ParseStream),
+            so that commands typed over and over ('look', 'n', 'get
+            lamp') needn't be parsed every time.
+
+            At most size entries are kept; when it's full, the quarter
+            which were used least recently are dropped.  hits and misses
+            count how well it's doing.
+    """
+
+    def __init__(self, size=500):
+        self.size = size
+        self.entries = {}   # key -> [value, tick when last used]
+        self.tick = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def Get(self, pKey):
+        """
+        return what was Put for pKey, or None
+        """
+        self.tick = self.tick + 1
+        entry = self.entries.get(pKey)
+        if entry is None:
+            self.misses = self.misses + 1
+            return None
+        self.hits = self.hits + 1
+        entry[1] = self.tick
+        return entry[0]
+
+    def Put(self, pKey, pValue):
+        """
+        remember pValue for pKey, forgetting old entries if need be
+        """
+        if len(self.entries) >= self.size and not self.entries.has_key(pKey):
+            ticks = [entry[1] for entry in self.entries.values()]
+            ticks.sort()
+            oldest = ticks[len(ticks)/4]
+            for key, entry in self.entries.items():
+                if entry[1] <= oldest: del self.entries[key]
+        self.entries[pKey] = [pValue, self.tick]
+
+    def Clear(self):
+        self.entries = {}
+
+#----------------------------------------------------------------------
+#    Template -- a message for StuffString, split up once
+#
+class Template:
+    """
+    Template:
+            a message with <placeholders> in it (see Command.StuffString),
+            split once into its literal text and its placeholders, so
+            that filling it in for each listener only names the nouns
+            it mentions, each once.
+
+            A placeholder for a noun the command doesn't have (no
+            inobj, say) is left in the message as it is.
+    """
+
+    placeholders = {'<time>': ('time', 0, FALSE)}
+                    # placeholder -> (what it names, article, capitalize?)
+    for slot in ['actor', 'dirobj', 'inobj', 'toobj']:
+        placeholders['<%s>' % slot] = (slot, 0, FALSE)
+        placeholders['<%s>' % cap(slot)] = (slot, 0, TRUE)
+        for article in [The, the, A, a]:
+            placeholders['<%s %s>' % (article, slot)] = (slot, article, FALSE)
+    del slot, article
+    pattern = re.compile('(' + string.join(map(re.escape,
+                                               placeholders.keys()), '|') + ')')
+
+    def __init__(self, pStr):
+        self.parts = []     # literal strings and placeholders, in order
+        chunks = self.pattern.split(pStr)
+        for i in range(len(chunks)):
+            if i % 2: self.parts.append((chunks[i],) + self.placeholders[chunks[i]])
+            elif chunks[i]: self.parts.append(chunks[i])
+
+    def Fill(self, cmd, pFor=None):
+        """
+        return the message with its placeholders filled in from cmd,
+        as pFor would see them
+        """
+        names = {}
+        out = []
+        for part in self.parts:
+            if type(part) != type(()):
+                out.append(part)
+                continue
+            text, slot, article, capital = part
+            if not names.has_key(text):
+                if slot == 'time':
+                    names[text] = pub.scheduler.GetClock()
+                else:
+                    obj = getattr(cmd, slot)
+                    if slot != 'actor' and not isInstance(obj):
+                        names[text] = text
+                    elif capital: names[text] = cap(obj(0,pFor))
+                    else: names[text] = obj(article,pFor)
+            out.append(names[text])
+        return string.join(out, '')
+
+templates = ParseCache(1000)    # message -> its Template, for StuffString
+
+#----------------------------------------------------------------------
+#    CommandStream -- the quantal commands of a string, one at a time
+#
+class CommandStream:
+    """
+    CommandStream:
+            the quantal commands a string was parsed into, made one at
+            a time as they're wanted (see Parser.ParseStream).  Each
+            verb's worth of the string is kept as one segment, with the
+            lists of objects it had, so "get the coins, gems and rings
+            from the chest and box" takes no more room than it's long,
+            however many commands it comes to.
+
+            Next gives the next command, or None if there are no more;
+            len() is how many are left.  A CommandStream is an iterator
+            too, and pickles like any other object.
+    """
+
+    fields = ('dirobj', 'toobj', 'inobj', 'atobj', 'withobj')
+
+    def __init__(self, pSegments):
+        # (verb, dirobjs, toobjs, inobjs, atobjs, withobjs) for each verb
+        self.segments = pSegments
+        self.seg = 0        # which segment the next command comes from
+        self.index = 0      # and which of its commands it is
+        self.left = 0
+        for segment in pSegments: self.left = self.left + self.Size(segment)
+
+    def __len__(self):
+        return self.left
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        cmd = self.Next()
+        if cmd is None: raise StopIteration
+        return cmd
+
+    def Size(self, pSegment):
+        """
+        return the number of commands in pSegment
+        """
+        size = 1
+        for objs in pSegment[1:]: size = size * len(objs)
+        return size
+
+    def Next(self):
+        """
+        return the next command, or None
+        """
+        if not self.left: return None
+        segment = self.segments[self.seg]
+        cmd = Command()
+        cmd.verb = segment[0]
+        # the last objects change fastest, as in nested loops
+        i = self.index
+        for field in range(len(self.fields) - 1, -1, -1):
+            objs = segment[field + 1]
+            i, j = divmod(i, len(objs))
+            setattr(cmd, self.fields[field], objs[j])
+        self.index = self.index + 1
+        if self.index >= self.Size(segment):
+            self.seg = self.seg + 1
+            self.index = 0
+        self.left = self.left - 1
+        return cmd
+
 #----------------------------------------------------------------------
 #    Parser -- breaks a string into a command or set of commands
 #
@@ -568,40 +1485,53 @@ class Parser:
     """
     Parser:
             breaks a string into a command or set of commands
+
+            What Parse makes of a string is kept in the ParseCache
+            Parser.cache, shared by all parsers (and not saved with the
+            game), until the lexicons change.
     """
 
+    cache = ParseCache()
+
+    # a quoted string (the closing quote is optional), a word (and
+    # any comma after it), or something between words
+    wordpattern = re.compile(r'(")([^"]*)"?|([^ ,"][^ ,]*)(,?)|[ ,]')
     
     def __init__(self):
-        self.words = []
+        self.words = ()         # the words being parsed
+        self.pos = 0            # how far into them we've got
+        self.quoted = -1        # where the last quoted string is in them
         self.cmd = Command()
         self.it = ''
         self.me = ''
+        self.warned = FALSE
 
-    def NounWords(self,words):
+    def NounWords(self,words,pStart=0):
         """
         given a set of words, see how many words you can lump together
-        as a single noun from the beginning of the string. Thus,
+        as a single noun from the beginning of the string (or from
+        pStart). Thus,
             given: "give bucket of fish to bob"  we return: 0
                    "bucket of fish to bob"       ==>        3
                "bucket to bob"               ==>        1
         """
 
         # the first word must be an integer, "it", or in our noun list
-        if not words: return 0    # no words
-        if words[0] == 'it': return 1    # "it"
-        if words[0][0] == '"': return 1    # quoted string
-        if isInt(words[0]):    # integer
+        if pStart >= len(words): return 0    # no words
+        first = words[pStart]
+        if first == 'it': return 1    # "it"
+        if first[0] == '"': return 1    # quoted string
+        if isInt(first):    # integer
             # first word is an integer; convert to generic form
-            words[0] = "#"
-        if words[0]=="#" or words[0] in nouns:
+            words = ["#"] + list(words[pStart+1:])
+            first = "#"
+            pStart = 0
+        if first=="#" or first in nouns:
             # first word is in nouns; how many more words can we munch?
-            a = string.join(words)
-            matches = filter(lambda x,a=a: a[:len(x)] == x, nouns)
-            if not matches: return 1        # (must be a number)
-            # we now have a set of potential matches; find the longest
-            matches.sort(lambda a,b: cmp(len(a),len(b)))
-            longest = matches[len(matches)-1]
-            return len(string.split(longest))
+            nountrie.Update(nouns)
+            longest = nountrie.Longest(words, pStart)
+            if not longest: return 1        # (must be a number)
+            return longest
         return 0
 
     def FindPrep(self,words):
@@ -620,70 +1550,78 @@ class Parser:
     def MunchNouns(self,w):
         """
         starting at w, munch a set of nouns joined by conjunctions
-        return the set, and remove them from self.words
+        return the set, and leave self.pos just after them
         """
         
-        if w >= len(self.words): return []
+        words = self.words
+        self.pos = w
         out = []
-        nounwords = self.NounWords(self.words[w:])
+        nounwords = self.NounWords(words,w)
         while nounwords:
-            if self.words[w] == 'it': out = out + self.it
-            else: out.append(string.join(self.words[w:w+nounwords]))
-            self.words = self.words[:w] + self.words[w+nounwords:]
-            if w >= len(self.words) or self.words[w] not in conjs: 
+            if words[w] == 'it': out = out + self.it
+            else: out.append(string.join(words[w:w+nounwords]))
+            w = w + nounwords
+            self.pos = w
+            if w >= len(words) or words[w] not in conjs: 
                 return out
-            while self.words[w] in conjs:
-                self.words = self.words[:w] + self.words[w+1:]
-            nounwords = self.NounWords(self.words[w:])
+            while w < len(words) and words[w] in conjs: w = w + 1
+            self.pos = w
+            nounwords = self.NounWords(words,w)
         return out    
 
-    def WordEnd(self,pStr,pStart):
-        """
-        return the position of the end of the word,
-        given that it starts at pStart in string pStr
-        """
-
-        if pStr[pStart] == '"':
-            q = string.find(pStr,'"',pStart+1)
-            if q >= 0: return q
-        else:
-            space = string.find(pStr,' ',pStart)
-            comma = string.find(pStr,',',pStart)
-            if comma < 0 or (space >= 0 and space < comma):
-                if space >= 0: return space
-            elif comma >= 0: return comma
-        return len(pStr)
-    
     def BreakString(self,pStr):
         """
         break the string into a list of words
         - filter garbage and reduce non-quoted stuff to lower case
         - convert commas to conjunctions
+        A quoted string is one word, which keeps its opening quote.
         """
             
         w = []
-        # loop through string, building list w
-        wordstart = 0
-        wordend = 0
-        strlen = len(pStr)
-        while wordstart < strlen:
-            # find end of the current word
-            wordend = self.WordEnd(pStr,wordstart)
-            if pStr[wordstart] == '"':
-                w.append(pStr[wordstart:wordend])
-            else:
+        garbage = garbs.counts
+        for quote, quoted, word, comma in self.wordpattern.findall(pStr):
+            if quote: w.append(quote + quoted)
+            elif word:
                 # copy it into the list (unless it's garbage)
-                word = string.lower(pStr[wordstart:wordend])
-                if word:
-                    if wordend < strlen and pStr[wordend] == ',':
-                        if word and word not in garbs: w.append(word)
-                        w.append('and')
-                        wordend = wordend-1
-                    else:
-                        if word not in garbs: w.append(word)
-            # repeat from the new starting point
-            wordstart = wordend+1
+                word = string.lower(word)
+                if not garbage.has_key(word): w.append(word)
+                if comma: w.append('and')
         return w
+
+    def Start(self,pStr):
+        """
+        get ready to parse pStr: break it into words, translate them,
+        and start at the beginning
+        """
+        # special case: check for "say" with no quotes and other shortcuts
+        if pStr[0] == '"': pStr = "say "+pStr
+        elif len(pStr)>5 and \
+        string.lower(pStr[:4]) == "say " and pStr[4] != '"':
+            pStr = 'say "'+pStr[4:]
+                
+        # get words; strip out garbage
+        words = self.BreakString(pStr)
+       
+        # apply translations
+        if self.me: translations['me'] = self.me
+        self.quoted = -1
+        for i in xrange(len(words)):
+            if translations.has_key(words[i]):
+                words[i] = translations[words[i]]
+            if words[i][0] == '"': self.quoted = i
+        self.words = tuple(words)
+        self.pos = 0
+
+    def Resume(self,pStart):
+        """
+        carry on parsing from the verb at pStart, the words before it
+        having been dealt with
+        """
+        if pStart <= self.quoted or self.words[pStart][:3] == 'say':
+            # quoted strings and 'say' are read differently in the
+            # middle of a string; start over with the rest of it
+            self.Start(string.join(self.words[pStart:]))
+        else: self.pos = pStart
     
     def Parse(self,pStr=''):
         """
@@ -693,128 +1631,166 @@ class Parser:
         
         Eventually returns a list of quantal commands.
         """
-        cmdlist = []
-        cmdtext = pStr
-        while cmdtext:
-            # call the ParseCore routine, to strip one verb's worth
-            cmdtext = self.ParseCore(cmdtext)
-
-            # break the multiple objects into single objects, multiple commands
-            # hmm, there's gotta be a better way to do this...
-            cm = Command()
-            #print self.cmd
-            cm.verb = self.cmd.verb
-            if not self.cmd.dirobj: self.cmd.dirobj = ['']
-            if not self.cmd.toobj: self.cmd.toobj = ['']
-            if not self.cmd.inobj: self.cmd.inobj = ['']
-            if not self.cmd.atobj: self.cmd.atobj = ['']
-            if not self.cmd.withobj: self.cmd.withobj = ['']
-            for a in self.cmd.dirobj:
-              for b in self.cmd.toobj:
-                for c in self.cmd.inobj:
-                  for d in self.cmd.atobj:
-                    for e in self.cmd.withobj:
-                        cm.dirobj = a
-                        cm.toobj = b
-                        cm.inobj = c
-                        cm.atobj = d
-                        cm.withobj = e
-                        #print cm
-                        cmdlist.append(copy.copy(cm))
-        # now we have a nice list of quantal commands; return it
-        return cmdlist
+        return list(self.ParseStream(pStr))
+
+    def ParseStream(self,pStr='',pVersion=None):
+        """
+        parse pStr, like Parse, but return a CommandStream which makes
+        the quantal commands as they're wanted, instead of all at once
+        (pVersion is lexversion(), if the caller already knows it)
+        """
+        key = self.CacheKey(pStr,pVersion)
+        cached = self.cache.Get(key)
+        if cached:
+            segments, it = cached
+            if it is not None: self.it = it
+            return CommandStream(segments)
+        self.warned = FALSE
+        it = self.it
+        segments = []
+        more = FALSE
+        if pStr:
+            self.Start(pStr)
+            more = TRUE
+        while more:
+            # call the ParseCore routine, to take one verb's worth
+            more = self.ParseCore()
+
+            # the multiple objects are kept together; the CommandStream
+            # breaks them into single objects, multiple commands
+            segments.append((self.cmd.verb, self.cmd.dirobj or [''],
+                             self.cmd.toobj or [''], self.cmd.inobj or [''],
+                             self.cmd.atobj or [''], self.cmd.withobj or ['']))
+        # remember it, unless something was wrong with the string
+        # (and what 'it' became, if the string changed it)
+        if not self.warned:
+            if self.it is it: it = None
+            else: it = self.it
+            self.cache.Put(key, (segments, it))
+        return CommandStream(segments)
+
+    def ParseMany(self,pStrs,pParsers=None):
+        """
+        parse a batch of strings -- a tick's worth of input from all
+        the players, say -- and return a CommandStream for each.
+        pParsers has the parser to use for each string (each player's
+        own, which knows 'me' and 'it'); otherwise this one parses them
+        all, in order.  The lexicons' version is found once for the
+        batch, and strings which come to the same thing are parsed only
+        once, the rest coming from the cache.
+        """
+        if pParsers is None: pParsers = [self] * len(pStrs)
+        version = lexversion()
+        out = []
+        for i in xrange(len(pStrs)):
+            out.append(pParsers[i].ParseStream(pStrs[i], version))
+        return out
+
+    def CacheKey(self,pStr,pVersion=None):
+        """
+        return the cache key for pStr: the string (in lower case,
+        with spaces tidied, unless it has quoted text) and whatever else
+        the parse depends on -- the lexicons, and what 'me' and 'it'
+        stand for, if they're used
+        """
+        if pVersion is None: pVersion = lexversion()
+        low = string.lower(pStr)
+        if '"' not in pStr and low[:3] != 'say':
+            pStr = low = string.join(filter(None, string.split(low, ' ')))
+        me = self.me or translations.get('me')
+        if len(translations) > translations.has_key('me'):
+            # other translations might give 'me' or 'it' too
+            return (pStr, pVersion, me, tuple(self.it),
+                    tuple(translations.items()))
+        if string.find(low, 'me') < 0: me = None
+        it = None
+        if string.find(low, 'it') >= 0: it = tuple(self.it)
+        return (pStr, pVersion, me, it)
     
-    def ParseCore(self,pStr):
+    def ParseCore(self):
         """
         Does all the namecalling, cleaning up and findind our verbs,
-        prepositions and so on. 
+        prepositions and so on, for the next verb's worth of self.words.
+        Returns TRUE if there's another command after it.
         """
-        #print "Parsing:",pStr
+        #print "Parsing:",self.words[self.pos:]
         self.cmd.Clear()
-
-        # special case: check for "say" with no quotes and other shortcuts
-        if pStr[0] == '"': pStr = "say "+pStr
-        elif len(pStr)>5 and \
-        string.lower(pStr[:4]) == "say " and pStr[4] != '"':
-            pStr = 'say "'+pStr[4:]
-                
-        # get words; strip out garbage
-        self.words = self.BreakString(pStr)
-       
-        # apply translations
-        if self.me: translations['me'] = self.me
-        for i in range(0,len(self.words)):
-            if translations.has_key(self.words[i]):
-                self.words[i] = translations[self.words[i]]
+        words = self.words
+        end = len(words)
                
         # first word should be a verb -- if not, supply 'defverb'
-        w = 0
-        if len(self.words)>w and self.words[w] in verbs:
-            self.cmd.verb = self.words[w]
+        w = self.pos
+        if end>w and words[w] in verbs:
+            self.cmd.verb = words[w]
             w = w + 1
         else:    self.cmd.verb = 'defverb'
         
         # after verb: nothing, adverb, noun or conjuction
-        if len(self.words) < w+1: return ''        # no more words
+        if end < w+1: return FALSE        # no more words
         
         # look for verb modifiers
-        if self.words[w] in adverbs:
-            self.cmd.verb = self.cmd.verb + ' ' + self.words[w]
-            self.words = self.words[:w] + self.words[w+1:]
-            if w >= len(self.words): return ''
+        if words[w] in adverbs:
+            self.cmd.verb = self.cmd.verb + ' ' + words[w]
+            w = w + 1
+            if w >= end: return FALSE
         
         # munch conjunctions
-        while self.words[w] in conjs:
-            self.words = self.words[:w] + self.words[w+1:]
+        while w < end and words[w] in conjs: w = w + 1
         
         # munch a direct object
         self.cmd.dirobj = self.MunchNouns(w)
         
         # if there's another noun phrase, then it's the DO and we had IO before
-        temp = self.MunchNouns(w)
+        temp = self.MunchNouns(self.pos)
         if temp:
             self.cmd.toobj = self.cmd.dirobj
             self.cmd.dirobj = temp
+        w = self.pos
 
         if self.cmd.dirobj: self.it = self.cmd.dirobj
-        if len(self.words) < w+1: return ''        # no more words
+        if end < w+1: return FALSE        # no more words
                
-        while self.words[w] in preps:
+        while words[w] in preps:
             # find the object of the preposition, and assign appropriately
             objs = self.MunchNouns(w+1)
             if not objs:
-                pub.player.Tell("..." + self.words[w] + " WHAT?!?")
-                return '' 
+                pub.player.Tell("..." + words[w] + " WHAT?!?")
+                self.warned = TRUE
+                return FALSE
                    
-            if self.words[w] == 'at': self.cmd.atobj = objs
-            elif self.words[w] == 'in' or self.words[w] == 'into' \
-              or self.words[w] == 'from': self.cmd.inobj = objs
-            elif self.words[w] == 'with': self.cmd.withobj = objs
-            elif self.words[w] == 'to': self.cmd.toobj = objs
-            else: print "ERROR: unknown preposition " + self.words[w]
+            if words[w] == 'at': self.cmd.atobj = objs
+            elif words[w] == 'in' or words[w] == 'into' \
+              or words[w] == 'from': self.cmd.inobj = objs
+            elif words[w] == 'with': self.cmd.withobj = objs
+            elif words[w] == 'to': self.cmd.toobj = objs
+            else:
+                print "ERROR: unknown preposition " + words[w]
+                self.warned = TRUE
                 
-            # munch preposition
-            self.words = self.words[:w] + self.words[w+1:]
+            # on past the preposition and its objects
+            w = self.pos
 
             self.it = objs
-            if len(self.words) < w+1: return ''    # no more words
+            if end < w+1: return FALSE    # no more words
                 
         # look for dangling verb modifiers
-        if self.words[w] in adverbs:
-            self.cmd.verb = self.cmd.verb + ' ' + self.words[w]
-            self.words = self.words[:w] + self.words[w+1:]
-            if w >= len(self.words): return ''
+        if words[w] in adverbs:
+            self.cmd.verb = self.cmd.verb + ' ' + words[w]
+            w = w + 1
+            if w >= end: return FALSE
             # munch conjunctions
-            while self.words[w] in conjs:
-                self.words = self.words[:w] + self.words[w+1:]
+            while w < end and words[w] in conjs: w = w + 1
+            if w >= end: return FALSE
                    
         # next word should be a verb
-        if self.words[w] in verbs:
-            return string.join(self.words[w:])
+        if words[w] in verbs:
+            self.Resume(w)
+            return TRUE
         
         # if not, something's wrong -- might be unknown word
-        print 'Warning: unknown word '+self.words[w]
-        return '' 
+        print 'Warning: unknown word '+words[w]
+        self.warned = TRUE
+        return FALSE
         
         def Test(self):
             """
@@ -840,21 +1816,23 @@ def AddVerb( *pVerbs ):
     """
     for item in pVerbs:
         if type(item) == types.StringType:
-            if item not in verbs: verbs.append(item)
+            verbs.Add(item)
         else:
             for subitem in item:
-                if subitem not in verbs: verbs.append(subitem)
-    verbs.sort()
+                verbs.Add(subitem)
             
 #----------------------------------------------------------------------
 
-verbs = ['drop','get','go','inv','look','eat','give','put','use']
-adverbs = ['on','off']
-nouns = ['it','self','me','here','room','fish','fish bucket','bucket','rock']
-conjs = ['and','then']
-preps = ['at','in','into','with','from','to']
-garbs = ['the','a']
+verbs = Lexicon(['drop','get','go','inv','look','eat','give','put','use'],
+                keepsorted=TRUE)
+adverbs = Lexicon(['on','off'])
+nouns = Lexicon(['it','self','me','here','room','fish','fish bucket','bucket',
+                 'rock'])
+conjs = Lexicon(['and','then'])
+preps = Lexicon(['at','in','into','with','from','to'])
+garbs = Lexicon(['the','a'])
 translations = {}
+nountrie = NounTrie()   # kept up to date with nouns by Parser.NounWords
 
 #----------------------------------------------------------------------
 # Verb -- base class of any Verb object
@@ -944,7 +1922,7 @@ class Verb:
         """ 
         if cmd.actor.busytill > pub.scheduler.minutes:
             pub.scheduler.AddAbsEvent(cmd.actor.busytill, \
-                                      Event(self,'object.Begin(cmd)',cmd) )
+                                      MethodEvent(self,'Begin',(cmd,),cmd) )
             return
         # if actor is not busy, then begin command immediately
         self.Begin(cmd)
@@ -991,6 +1969,15 @@ class BaseThing:
         (why not 'Noun'?)
     """
         
+    derived = ('enclosingroom',)
+                    # attributes rebuilt when wanted, so not saved
+    watched = {'light': 'LightChanged', 'container': 'ForgetRoom',
+               'invisible': 'SightChanged', 'seesInvisible': 'SightChanged',
+               'seesDark': 'SightChanged', 'listening': 'ListeningChanged'}
+                    # attribute -> method called with its old value when
+                    # it's changed by Set, for things kept up to date with it
+    enclosingroom = None    # what GetRoom found, till we're moved
+
     # initialization method
     def __init__(self,pName=''):
         self.a = 'a'    # article to use for 'a'
@@ -1019,7 +2006,7 @@ class BaseThing:
 
         # add names to the parser's list of nouns
         for n in self.synonyms:
-            if n not in nouns: nouns.append(n)
+            nouns.Add(n)
 
     
     def __getinitargs__(self):
@@ -1027,6 +2014,36 @@ class BaseThing:
         get arguments (used by copy.copy)
         """
         return (string.join(self.synonyms,','),)
+
+    def Set(self, pName, pValue):
+        """
+        set an attribute, letting the watcher of a watched one know
+        (see 'watched'); once a thing is in the world, its light,
+        container, invisible and the rest must be changed this way,
+        or what's kept up to date with them won't be
+        """
+        old = self.__dict__.get(pName)
+        self.__dict__[pName] = pValue
+        if old != pValue and self.watched.has_key(pName):
+            getattr(self, self.watched[pName])(old)
+
+    def __getstate__(self):
+        """
+        leave the derived attributes out of saved games (and copies)
+        """
+        state = self.__dict__.copy()
+        for name in self.derived:
+            if state.has_key(name): del state[name]
+        return state
+
+    def __setstate__(self, state):
+        """
+        restore a saved (or copied) thing, forgetting whatever derived
+        attributes __init__ worked out before the state was put back
+        """
+        for name in self.derived:
+            if self.__dict__.has_key(name): del self.__dict__[name]
+        self.__dict__.update(state)
  
     
     def GetName(self, article=0, pLooker=None):
@@ -1058,6 +2075,13 @@ class BaseThing:
         """
         return pName in self.synonyms
 
+    def IndexNames(self):
+        """
+        names to file this under in a container's NameIndex; None if
+        NameMatch takes names which can't be listed
+        """
+        return self.synonyms
+
 
     def GetNote(self):
         """
@@ -1085,14 +2109,53 @@ class BaseThing:
         return self.desc
 
     
+    def LightChanged(self, pOld):
+        """
+        let the containers around know that our light has changed
+        """
+        container = self.__dict__.get('container')
+        if container: container.AddLight(self.light - (pOld or 0))
+        self.SightChanged()
+
+    def ListeningChanged(self, pOld):
+        """
+        let the containers around know we've started or stopped
+        listening
+        """
+        container = self.__dict__.get('container')
+        if container: container.ListenersChanged()
+
+    def SightChanged(self, pOld=None):
+        """
+        let our room forget who it found could see what
+        """
+        room = self.GetRoom()
+        if room: room.ForgetSight()
+
+    def Glow(self):
+        """
+        get the light given off by this and anything in it
+        """
+        return self.light
+
+    
     def GetRoom(self):
         """
         get room (not just any container, but the first ROOM container)
         """
-        cont = self
-        while cont and not hasattr(cont,'ComputeTotalLight'):
-            cont = cont.container
-        return cont
+        room = self.enclosingroom
+        if room is None:
+            room = self
+            while room and not hasattr(room,'ComputeTotalLight'):
+                room = room.container
+            if room is not self: self.enclosingroom = room
+        return room
+
+    def ForgetRoom(self, pOld=None):
+        """
+        forget what GetRoom found (we've been moved)
+        """
+        if self.enclosingroom is not None: self.enclosingroom = None
 
     
     def GetListLine(self): 
@@ -1114,6 +2177,17 @@ class BaseThing:
         # if we're blind, automatically return FALSE
         if self.blind: return FALSE
 
+        # in the same room, the room may already know (see SightCache)
+        room = self.GetRoom()
+        if room and pWhat.GetRoom() is room:
+            return room.Sight().Sees(self, pWhat)
+        return self.Sees(pWhat)
+
+    def Sees(self, pWhat):
+        """
+        work out whether we can see the given object, if we're not
+        blind (what CanSee remembers)
+        """
         # figure effect of lighting and night vision...
 
         effectiveLight = self.GetRoom().light + self.seesDark
@@ -1171,7 +2245,7 @@ class BaseThing:
         """
         if pWhere == 'TRASH': 
             if self.container: 
-                self.container.contents.remove(self)
+                self.container.RemoveNoCheck(self)
                 del self
                 return CANCEL 
         if not pWhere.CanContain(self) \
@@ -1182,6 +2256,106 @@ class BaseThing:
         return OK
                     
 
+#----------------------------------------------------------------------
+# NameIndex -- the things in a container, by the names they go by
+#
+class NameIndex:
+    """
+    NameIndex:
+            the things in a container filed under their names (see 
+            BaseThing.IndexNames), so that finding what a noun refers
+            to needn't try NameMatch on everything in sight.  A name
+            starting with a number ("3 coins") is looked up without it
+            too, for Countables.
+
+            Things are filed under the names they have when they're
+            added; the container keeps this up to date as things are
+            put in (ContainNoCheck) and taken out (RemoveNoCheck).
+    """
+
+    def __init__(self, pThings=()):
+        self.names = {}     # name -> things with it, in the order added
+        self.others = []    # things with no IndexNames, tried for any name
+        self.filed = {}     # id(thing) -> names filed under
+        for thing in pThings: self.Add(thing)
+
+    def Add(self, pThing):
+        names = pThing.IndexNames()
+        if names is None: self.others.append(pThing)
+        else:
+            filed = {}
+            for name in names:
+                if filed.has_key(name): continue
+                filed[name] = 1
+                if self.names.has_key(name): self.names[name].append(pThing)
+                else: self.names[name] = [pThing]
+            names = filed.keys()
+        self.filed[id(pThing)] = names
+
+    def Remove(self, pThing):
+        names = self.filed[id(pThing)]
+        del self.filed[id(pThing)]
+        if names is None: self.others.remove(pThing)
+        else:
+            for name in names:
+                things = self.names[name]
+                things.remove(pThing)
+                if not things: del self.names[name]
+
+    def Find(self, pName, pContents):
+        """
+        return the things which might go by pName, in the order they
+        are in pContents (the container's contents)
+        """
+        if not isString(pName): return []
+        found = []
+        if self.names.has_key(pName): found.append(self.names[pName])
+        words = string.split(pName)
+        if len(words) > 1 and isInt(words[0]):
+            rest = string.join(words[1:])
+            if self.names.has_key(rest): found.append(self.names[rest])
+        if self.others: found.append(self.others)
+        if not found: return []
+        if len(found) == 1: return found[0][:]
+        wanted = {}
+        for things in found:
+            for thing in things: wanted[id(thing)] = 1
+        return filter(lambda x,w=wanted: w.has_key(id(x)), pContents)
+
+#----------------------------------------------------------------------
+# SightCache -- who in a room can see what, as it's worked out
+#
+class SightCache:
+    """
+    SightCache:
+            what a room has found out about who in it can see what
+            (see BaseThing.CanSee), so that describing a crowded room
+            doesn't work out the light and invisibility of every looker
+            and thing again.  The room clears it whenever anything in
+            it is moved, or changes its light, its invisibility or how
+            well it sees in the dark.  Blindness isn't remembered.
+
+            'hits' and 'misses' count how often it knew (the @sight
+            debug verb shows them).
+    """
+
+    def __init__(self):
+        self.seen = {}      # (id(looker), id(thing)) -> can it see it?
+        self.hits = 0
+        self.misses = 0
+
+    def Sees(self, pLooker, pWhat):
+        key = (id(pLooker), id(pWhat))
+        if self.seen.has_key(key):
+            self.hits = self.hits + 1
+            return self.seen[key]
+        self.misses = self.misses + 1
+        seen = self.seen[key] = pLooker.Sees(pWhat)
+        return seen
+
+    def Clear(self):
+        self.seen = {}
+
 #----------------------------------------------------------------------
 # Symbol -- Base class for nouns and components -- used by the
 #           component based object system
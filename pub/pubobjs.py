@@ -257,8 +257,23 @@ class Container (Thing):
         as length/breasth/weight or other considerations).
         Also sizes seem not to be additive, can contain
         as many smaller things as we want..
+
+        The contents are also kept in a NameIndex (see Names),
+        and VisibleContents and VisibleContainers are remembered
+        until something inside changes (see ContentsChanged), as
+        is the total light of everything inside (see LightSum), so
+        things put in or taken out other than by ContainNoCheck
+        and RemoveNoCheck won't be found or counted.
     """
 
+    derived = Thing.derived + ('nameindex', 'visiblecontents',
+                               'visiblecontainers', 'listeners', 'lightsum')
+    nameindex = None        # the NameIndex of the contents, once wanted
+    visiblecontents = None  # what VisibleContents returned, till changed
+    visiblecontainers = None    # and VisibleContainers
+    listeners = None        # and Listeners
+    lightsum = None         # light of everything inside, once counted
+
     # initialization method
     def __init__(self,pNames=''):
         Thing.__init__(self,pNames)
@@ -282,9 +297,100 @@ class Container (Thing):
         for item in pThing:
             if item.container != None:
                 # remove from previous container
-                item.container.contents.remove(item)
-            item.container = self
+                item.container.RemoveNoCheck(item)
+            item.Set('container', self)
             self.contents.append(item)
+            if self.nameindex: self.nameindex.Add(item)
+            glow = item.Glow()
+            if glow: self.AddLight(glow)
+        self.ContentsChanged()
+
+    def RemoveNoCheck(self,*pThing):
+        """
+        Takes objects out of the container (without putting
+        them anywhere else).
+        """
+        for item in pThing:
+            self.contents.remove(item)
+            if self.nameindex: self.nameindex.Remove(item)
+            glow = item.Glow()
+            if glow: self.AddLight(-glow)
+        self.ContentsChanged()
+
+    def ContentsChanged(self):
+        """
+        Forgets what's visible in here and in the containers
+        around it.  Call this when what can be seen inside
+        changes other than by things being put in or taken out.
+        """
+        cont = self
+        while cont and cont.visiblecontents is not None:
+            cont.visiblecontents = None
+            cont.visiblecontainers = None
+            cont.listeners = None
+            cont = cont.container
+        # (a container's is only kept while those inside it are)
+        room = self.GetRoom()
+        if room: room.ForgetSight()
+
+    def ListenersChanged(self):
+        """
+        Forgets what's listening in here and in the containers
+        around it.  Called when something inside starts or
+        stops listening.
+        """
+        cont = self
+        while cont:
+            cont.listeners = None
+            cont = cont.container
+
+    def LightSum(self):
+        """
+        Returns the total light of everything inside, as
+        VisibleContents would find it (counted once, then
+        kept up to date by AddLight).
+        """
+        if self.lightsum is None:
+            total = 0
+            for item in self.contents:
+                total = total + item.Glow()
+            self.lightsum = total
+        return self.lightsum
+
+    def AddLight(self,pDelta):
+        """
+        Notes that the light inside has changed by pDelta,
+        here and in the containers around (rooms among them
+        recompute their total light).
+        """
+        cont = self
+        while cont:
+            if cont.lightsum is not None:
+                cont.lightsum = cont.lightsum + pDelta
+            if hasattr(cont,'ComputeTotalLight'): cont.ComputeTotalLight()
+            cont = cont.container
+
+    def Glow(self):
+        """
+        Returns the light given off by this and everything in it.
+        """
+        if not hasattr(self,'contents'): return self.light  # (being made)
+        return self.light + self.LightSum()
+
+    def Names(self):
+        """
+        The NameIndex of the contents (made when first wanted).
+        """
+        if not self.nameindex: self.nameindex = NameIndex(self.contents)
+        return self.nameindex
+
+    def NameMatches(self,pName):
+        """
+        Returns the objects directly inside which go by the
+        given name, in the order they're in the contents.
+        """
+        found = self.Names().Find(pName, self.contents)
+        return filter(lambda x,a=pName: x.NameMatch(a), found)
 
     def PreObj(self,cmd):
         if cmd.verb == pubverbs.put and cmd.inobj == self:
@@ -310,18 +416,58 @@ class Container (Thing):
             out = out + '\n' + item.GetListLine()
         return out
 
+    def ForgetRoom(self,pOld=None):
+        """
+        Forgets the room, here and for everything inside
+        (since this has been moved).
+        """
+        Thing.ForgetRoom(self)
+        if not hasattr(self,'contents'): return     # (being made)
+        for item in self.contents: item.ForgetRoom()
+
     # return list of visible contents as objects (recursively)
     def VisibleContents(self):
         """
         Returns a list of contents recursively. The comments say
         it must be transparent or open, but I don't see any code
         to check that.
+
+        The list is kept until the contents change, so callers
+        mustn't change it.
         """
-        out = self.contents
-        for item in out:
-            if hasattr(item,'contents'):    # and is open or transparent...
-                out = out + item.VisibleContents()
-        return out
+        if self.visiblecontents is None:
+            out = self.contents[:]
+            for item in self.contents:
+                if hasattr(item,'contents'):    # and is open or transparent...
+                    out.extend(item.VisibleContents())
+            self.visiblecontents = out
+        return self.visiblecontents
+
+    def VisibleContainers(self):
+        """
+        Returns this container and those inside it (recursively),
+        in the order VisibleContents goes through them.
+        """
+        if self.visiblecontainers is None:
+            self.VisibleContents()      # (so that changes will be noticed)
+            out = [self]
+            for item in self.contents:
+                if hasattr(item,'contents'):
+                    out.extend(item.VisibleContainers())
+            self.visiblecontainers = out
+        return self.visiblecontainers
+
+    def Listeners(self):
+        """
+        Returns the things in VisibleContents which are
+        listening (want Tell calls), in the same order.  Like
+        VisibleContents it's kept until something changes,
+        so callers mustn't change it.
+        """
+        if self.listeners is None:
+            self.listeners = filter(lambda x: x.listening,
+                                    self.VisibleContents())
+        return self.listeners
 
 # end of class Container
 
@@ -340,11 +486,18 @@ class Room(Container):
         messages to anyone in the room (Player or NPC?)
     """
 
+    derived = Container.derived + ('sightcache',)
+    watched = Container.watched.copy()
+    watched['ownLight'] = 'ComputeTotalLight'
+    sightcache = None   # who in here can see what (see Sight)
+
     def __init__(self,pNames=''):
         Container.__init__(self,pNames)
-        self.ownLight = 75        # internal light, where 0=pitch black, 100=sunlight
-        self.light = 75            # total light (including light sources)
+        self.Set('ownLight', 75)  # internal light, where 0=pitch black, 100=sunlight
+        self.Set('light', 75)     # total light (including light sources)
         self.size = 5000
+        # (a restored room is already where the saved game had it)
+        if pub.restoring: return
         if pub.universe and pub.universe != self: pub.universe.ContainNoCheck(self)
         pub.lastroom = self        # note last room created
 
@@ -376,21 +529,45 @@ class Room(Container):
         If we 'Tell' a 'Room', it means 'Tell' all the 'Actor's
         in the 'Room'.
         """
-        whom = filter(lambda x,n=pExcept: x.listening and x not in n, self.contents)
+        whom = filter(lambda x,s=self,n=pExcept: x.container is s and x not in n,
+                      self.Listeners())
         for i in whom: i.Tell(pWhat)
 
-    def ComputeTotalLight(self):
+    def ForgetRoom(self,pOld=None):
+        """
+        Does nothing: a room is its own room, and still the
+        room of everything inside it.
+        """
+        return
+
+    def ComputeTotalLight(self,pOld=None):
         """
         Count how many light sources we have available. --
         Including ones contained in (transparent or open?)
-        containers in the room.
+        containers in the room.  Their total is kept up to
+        date as things move or change their light (see
+        Container.LightSum), so this is quick.
         """
         if self == pub.universe: return    # don't bother for universe object
-        self.light = self.ownLight
-        for item in self.VisibleContents():
-            self.light = self.light + item.light
+        self.Set('light', self.ownLight + self.LightSum())
         return self.light
 
+    def Sight(self):
+        """
+        Returns the SightCache of who in here can see what,
+        making it when first wanted.
+        """
+        if self.sightcache is None: self.sightcache = SightCache()
+        return self.sightcache
+
+    def ForgetSight(self):
+        """
+        Forgets who in here can see what.  Call this when
+        that may have changed other than by things moving or
+        changing their light, invisibility or seesDark.
+        """
+        if self.sightcache is not None: self.sightcache.Clear()
+
 # end of class Room
 
 #----------------------------------------------------------------------
@@ -437,7 +614,7 @@ class Exit(Thing):
         Thing.__init__(self,pNames)
         self.dest = None        # by default, no destination
         self.salient = 0        # and not salient
-        self.light = 1            # but glows in the dark (i.e., usable in dark)
+        self.Set('light', 1)      # but glows in the dark (i.e., usable in dark)
         self.size = 300            # and as big as 3 people
         self.defverb = pubverbs.go    # no verb needed to go thru
         self.opostsucc = '<The actor> enters the room.'    # msg to others in destination
@@ -508,18 +685,25 @@ class Actor(Container):
         This will probably be the parent class of
         agent-extensions to PUB. (See 'NPC' for
         what will probably be expected of them.
+
+        Actors whose commands come from a person set 'recorded',
+        so that pub.recorder (see replay.py) writes them down.
     """
 
+    recorded = FALSE
+    sleeping = FALSE    # (for games saved before actors could sleep)
+
     def __init__(self,pNames=''):
         Container.__init__(self,pNames)
         self.a = ''            # no article for Actors
-        self.cmdList = []        # list of commands to be executed
+        self.cmdList = []        # commands (or CommandStreams) to do
         self.size = 100            # human-sized
-        self.listening = 1        # wants Tell() calls
+        self.Set('listening', 1)  # wants Tell() calls
         self.par = Parser()        # my very own command interpreter
         self.par.me = self.synonyms[0]    # which knows my name
         self.speakingTo = None    # whom we're addressing
         self.busytill = 0        # busy until what time?
+        self.sleeping = FALSE    # idle until Wake() is called?
         self.invisName = "someone"
         self.followers = []        # list of actors following
         self.following = None    # whom we're following
@@ -545,6 +729,19 @@ class Actor(Container):
         """
         return
 
+    def Wake(self):
+        """
+        Schedule an 'Act' for an actor which has gone to sleep. --
+        Actors driven by input (see pubtcp and pubcgi) set 'sleeping' 
+        when they run out of commands instead of polling every minute;
+        whatever gives them new input should call this.  An actor
+        with nothing scheduled is woken too, asleep or not, since
+        nothing else would make it act again.
+        """
+        if self.sleeping or not pub.scheduler.HasEventFor(self):
+            self.sleeping = FALSE
+            pub.scheduler.AddEvent( 0, MethodEvent(self, 'Act') )
+
     def Announce(self, pWhat):
         """
         Speak to the room --
@@ -569,17 +766,38 @@ class Actor(Container):
         # plus room's container's contents (maybe later)
         return out
 
+    def LocalListeners(self):
+        """
+        Everything in LocalNouns which is listening.
+        """
+        return self.container.Listeners()
+
+    # get the containers whose contents are in visible/reachable range
+    def NounScope(self):
+        """
+        The containers LocalNouns looks in --
+        
+        Looking up names in these (see FindNoun) gives the same
+        objects as searching LocalNouns, without going through
+        everything in it.  A command's nouns are all looked up
+        in one NounScope.
+        """
+        return self.container.VisibleContainers()
+
     # given the name of a noun, return the visible object
-    def FindNoun(self,pName,cmd=None):
+    def FindNoun(self,pName,cmd=None,pScope=None):
         """
         Find a thing if in the room --
         Given the name of a noun, return the visible object.
         Returns None if the noun can't be found (?).
+        pScope is a NounScope to search, if there's one already.
         """
         if not pName: return None
         if pName == 'self' or pName == 'me': return self
         if pName == 'here' or pName == 'room': return self.container
-        l = filter(lambda x,a=pName: x.NameMatch(a),self.LocalNouns())
+        if pScope is None: pScope = self.NounScope()
+        l = []
+        for cont in pScope: l.extend(cont.NameMatches(pName))
         if len(l) > 1 and cmd:
             # multiple matches... try to resolve by context
             l2 = []
@@ -596,22 +814,38 @@ class Actor(Container):
         return l[0]
 
     # similar to above, but if it can't find the object, return the given string
-    def NameToObj(self,pName,cmd=None):
+    def NameToObj(self,pName,cmd=None,pScope=None):
         """
         Find a thing in the room --
         Given the name of a noun, return the visible object.
         If not found, returns the name (first argument to this method).
         """
-        ans = self.FindNoun(pName,cmd)
+        ans = self.FindNoun(pName,cmd,pScope)
         if ans: return ans
         return pName
 
-    def DoCommandString(self,cmdstr):
+    def CommandText(self,cmdstr):
+        """
+        The text to parse for a command string --
+            If first word is an Actor's name, it's made into a
+            "say" action.
+        """
+        # check for direct address
+        firstword = stripPunctuation( string.split(cmdstr)[0] )
+        obj = self.NameToObj(firstword)
+        if hasattr(obj,'DoCommandString'):
+            # a-ha!  Direct address... make it into a SAY command
+            cmdstr = 'say "' + cmdstr + '"'
+        return cmdstr
+
+    def DoCommandString(self,cmdstr,cmds=None):
         """
         Interpret a command to the actor. --
 
         If first word is an Actor's name, interpret it as
-        a "say" action.
+        a "say" action (see CommandText).  cmds is what the
+        command string was parsed into, if that's been done
+        already (see pubtcp.ParseInput).
 
         There's a concept here of a 'command list', which I hope
         will become clear from other parts of the code.
@@ -621,21 +855,34 @@ class Actor(Container):
         some other part of the code -- perhaps commands consume
         turns?).
         """
-        # check for direct address
-        firstword = stripPunctuation( string.split(cmdstr)[0] )
-        obj = self.NameToObj(firstword)
-        if hasattr(obj,'DoCommandString'):
-            # a-ha!  Direct address... make it into a SAY command
-            cmdstr = 'say "' + cmdstr + '"'
-
         # build the command list from the command string
-        # (insert at beginning, so we can insert prerequisite commands)
-        self.cmdList = self.par.Parse(cmdstr) + self.cmdList
+        # (insert at beginning, so we can insert prerequisite commands);
+        # the commands are made one at a time, as they're done
+        if cmds is None: cmds = self.par.ParseStream(self.CommandText(cmdstr))
+        if pub.recorder and self.recorded:
+            pub.recorder.Note(self, cmdstr, cmds)
+        if cmds: self.cmdList.insert(0, cmds)
         #print "@Got: ",map(str,self.cmdList)
 
         # do the first command in the list immediately
         self.DoNextCmd();
     
+    def NextCmd(self):
+        """
+        Take the next command off the list --
+            Returns a copy of it, or None if there are none.  A
+            CommandStream in the list gives one command at a time,
+            and is dropped when it has no more.
+        """
+        if not self.cmdList: return None
+        first = self.cmdList[0]
+        if not isinstance(first, CommandStream):
+            del self.cmdList[0]
+            return copy.copy(first)
+        cmd = first.Next()
+        if not first: del self.cmdList[0]
+        return cmd
+
     def DoNextCmd(self):
         """
         Do the next command in the list --
@@ -644,9 +891,8 @@ class Actor(Container):
             
             So commands consume turns or time.
         """
-        if not self.cmdList: return CANCEL
-        cmd = copy.copy(self.cmdList[0])
-        self.cmdList = self.cmdList[1:]
+        cmd = self.NextCmd()
+        if not cmd: return CANCEL
         #if self == pub.player: print "Executing:", cmd
         cmd.actor = self
 
@@ -654,11 +900,12 @@ class Actor(Container):
             cmd.verb = pub.verbdict[cmd.verb]
         
         # attempt to find object references for all nouns in cmd
-        cmd.toobj = self.NameToObj(cmd.toobj,cmd)
-        cmd.dirobj = self.NameToObj(cmd.dirobj,cmd)
-        cmd.inobj = self.NameToObj(cmd.inobj,cmd)
-        cmd.atobj = self.NameToObj(cmd.atobj,cmd)
-        cmd.withobj = self.NameToObj(cmd.withobj,cmd)
+        scope = self.NounScope()
+        cmd.toobj = self.NameToObj(cmd.toobj,cmd,scope)
+        cmd.dirobj = self.NameToObj(cmd.dirobj,cmd,scope)
+        cmd.inobj = self.NameToObj(cmd.inobj,cmd,scope)
+        cmd.atobj = self.NameToObj(cmd.atobj,cmd,scope)
+        cmd.withobj = self.NameToObj(cmd.withobj,cmd,scope)
         
         # start the command
         # (the Verb object does most of the work)
@@ -679,10 +926,10 @@ class Actor(Container):
         # if there's more commands to be done, schedule an event to do it...
         if self.cmdList:
                 pub.scheduler.AddAbsEvent( self.busytill, \
-                        Event(self, 'object.DoNextCmd()' ) )
+                        MethodEvent(self, 'DoNextCmd' ) )
         else:
             # if not, schedule an Act() event to get more commands
-            pub.scheduler.AddAbsEvent( self.busytill, Event(self, 'object.Act()' ) )
+            pub.scheduler.AddAbsEvent( self.busytill, MethodEvent(self, 'Act' ) )
 
         return
 
@@ -716,8 +963,13 @@ class Player(Actor):
         instead of simply reacting as other actors do. (?)
 
         Has 'Tell' and 'Act' methods.
+
+        A sleeping Player doesn't prompt (a Replayer is giving the
+        commands).
     """
 
+    recorded = TRUE
+
     def __init__(self,pNames=''):
         Actor.__init__(self,pNames)
         try:
@@ -750,6 +1002,7 @@ class Player(Actor):
         If the player's persona already has commands to follow,
         it does, otherwise it asks what to do next.
         """
+        if self.sleeping: return
         if pub.scheduler.HasEventFor( self ): 
             # I've already got a scheduled event; no need to ask for input
             pub.scheduler.Update()
@@ -761,7 +1014,7 @@ class Player(Actor):
             print "WARNING: self != pub.player>",
         cmdstr = raw_input('>')
         if cmdstr: self.DoCommandString(cmdstr)
-        else: pub.scheduler.AddEvent( 1, Event(self, 'object.Act()') )
+        else: pub.scheduler.AddEvent( 1, MethodEvent(self, 'Act') )
 
 # end of class Player
 
@@ -803,18 +1056,29 @@ class Timer(Switch):
         self.failTurnOff = "You can't see any way to deactivate <the dirobj>."
         self.getOnOn = FALSE
         self.offOnDrop = FALSE
+        self.dueEvent = None
         
     def Activate(self,pUser):
         """
         Upon activation, schedule a 'ComeDue' event.
         """
-        pub.scheduler.AddEvent(self.delay,Event(self,'object.ComeDue()'))
+        self.dueEvent = MethodEvent(self,'ComeDue')
+        pub.scheduler.AddEvent(self.delay,self.dueEvent)
         Switch.Activate(self,pUser)
     
+    def Deactivate(self,pUser=None):
+        """
+        Turned off early, so the 'ComeDue' event is no longer wanted.
+        """
+        if self.dueEvent: pub.scheduler.Cancel(self.dueEvent)
+        self.dueEvent = None
+        Switch.Deactivate(self,pUser)
+
     def ComeDue(self):
         """
         Deactivate the switch when the time runs out.
         """
+        self.dueEvent = None
         here = self.container
         if self.dueCode: exec self.dueCode
         Switch.Deactivate(self)
@@ -915,8 +1179,7 @@ class Countable(Thing):
         self.quantity = 10
         self.pluralname = self.name + 's'
         for item in self.synonyms:
-            term = "# "+item
-            if term not in nouns: nouns.append(term)
+            nouns.Add("# "+item)
         self.newquantity = 0
         self.prevqty = 0
     
@@ -965,12 +1228,15 @@ class Countable(Thing):
         Divide the plural object into more than one
         plural object containing the same amount in total.
         """
-        # create a new object, pQty less than the current one
-        newobj = copy.copy(self)
-        # copy.copy calls the constructor, so the new object
-        # may get put into the last room built...
-        if pub.lastroom: pub.lastroom.contents.remove(newobj)
-        self.container.contents.append(newobj)
+        # create a new object, pQty less than the current one;
+        # copy.copy calls the constructor, so keep the new object
+        # from being put into the last room built...
+        lastroom = pub.lastroom
+        pub.lastroom = None
+        try: newobj = copy.copy(self)
+        finally: pub.lastroom = lastroom
+        newobj.Set('container', None)
+        self.container.ContainNoCheck(newobj)
         # split the quantities between the old and new objects
         newobj.quantity = newobj.quantity - pQty
         newobj.newquantity = newobj.quantity
@@ -984,7 +1250,7 @@ class Countable(Thing):
         """
         # absorb the other one into this one, and delete the other
         self.quantity = self.quantity + pOther.quantity
-        pOther.container.contents.remove(pOther)
+        pOther.container.RemoveNoCheck(pOther)
         del pOther
     
     def PostMove(self):
@@ -18,7 +18,7 @@ restoregame()       # load game from file
 
 pub.player.Tell(pub.player.container.GetDesc(pub.player))
 
-pub.scheduler.AddEvent( 0, Event(pub.player, 'object.Act()') )
+pub.scheduler.AddEvent( 0, MethodEvent(pub.player, 'Act') )
 
 
 while pub.gameStatus == RUNNING:
@@ -95,6 +95,8 @@ def Disconnect(player, msg=''):
     player.conn = None
     player.connected = 0
     if player in connlist: connlist.remove(player)
+    # nothing it was going to do matters now
+    if pub.scheduler: pub.scheduler.CancelFor(player)
 
 #----------------------------------------------------------------------
 # function to shut the server down
@@ -145,7 +147,6 @@ def NetUpdate():
 
     # handle incoming messages
     for u in connlist + LoginList:
-        u.Act()
         try:
             data = u.conn.recv(1024)
         except: data = None
@@ -157,6 +158,34 @@ def NetUpdate():
                 u.HandleMsg(data)
                 if data == "shutdown": running=-1
 
+    # parse everything which came in, all at once
+    ParseInput(connlist)
+
+#----------------------------------------------------------------------
+# parse the players' buffered commands in one batch
+#
+def ParseInput(players):
+    """
+    parse the commands in the players' input buffers which haven't been
+    parsed yet, with Parser.ParseMany, so that NetPlayer.Act needn't.
+    Each player's parsed gets (text, lexversion, CommandStream) for
+    each command, so Act can tell if the parse has gone out of date.
+    """
+    cmdstrs = []
+    parsers = []
+    for p in players:
+        for cmdstr in p.inbuf[len(p.parsed):]:
+            cmdstrs.append(p.CommandText(cmdstr))
+            parsers.append(p.par)
+    if not cmdstrs: return
+    version = lexversion()
+    streams = parsers[0].ParseMany(cmdstrs, parsers)
+    i = 0
+    for p in players:
+        for j in xrange(len(p.inbuf) - len(p.parsed)):
+            p.parsed.append((cmdstrs[i], version, streams[i]))
+            i = i + 1
+
 
 #----------------------------------------------------------------------
 #
@@ -164,6 +193,8 @@ def NetUpdate():
 #
 class NetPlayer(Actor):
 
+    recorded = TRUE
+
     def __init__(self,pNames):
         global NPlist
         Actor.__init__(self,pNames)
@@ -171,7 +202,10 @@ class NetPlayer(Actor):
         self.connected = 0
         self.conn = None
         self.inbuf = []
+        self.parsed = []    # what the first commands in inbuf parse to
+                            # (see ParseInput)
         self.password = ''
+        self.sleeping = TRUE
         NPlist.append(self)     
 
     def send(self, pWhat):
@@ -195,20 +229,33 @@ class NetPlayer(Actor):
         self.send( pWhat + endl )
 
     def Act(self):
+        # (unless a command gets started, sleep until HandleMsg wakes us)
         if pub.scheduler.HasEventFor( self ): 
+            self.sleeping = TRUE
             return
         # no scheduled events, so check for a command in the buffer
         if len(self.inbuf):
             cmdstr = self.inbuf[0]
             self.inbuf = self.inbuf[1:]
+            cmds = None
+            if self.parsed:
+                text, version, cmds = self.parsed[0]
+                self.parsed = self.parsed[1:]
+                # whom it addresses depends on who's here now, and what
+                # it parses to on the words known now
+                if version != lexversion() or \
+                   text != self.CommandText(cmdstr): cmds = None
 #           print self.name,"doing command:",cmdstr
             if cmdstr=='quit': self.Quit()
-            else: self.DoCommandString(cmdstr)
-        else: pub.scheduler.AddEvent( 1, Event(self, 'object.Act()') )
+            else: self.DoCommandString(cmdstr,cmds)
+        if not pub.scheduler.HasEventFor( self ):
+            self.sleeping = TRUE
+            if self.inbuf: self.Wake()  # (that one came to nothing)
 
     def HandleMsg(self,msg):
         # place the message in the inbuf, for later use
         self.inbuf.append(msg)
+        self.Wake()
 
     def Quit(self):
         # leave the game (without killing th server!)
@@ -278,4 +325,6 @@ class LoginConn(NetPlayer):
         LoginList.remove(self)
         self.send('Welcome, '+match.name+'!'+endl)
         match.inbuf = ["look"]
+        match.parsed = []
+        match.Wake()
         connlist.append(match)
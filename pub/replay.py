@@ -0,0 +1,189 @@
+#   replay.py    records the commands players give, and replays them
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+"""
+Recorder and Replayer
+
+While pub.recorder is a Recorder, every command string given to an actor
+which takes its commands from a person (see Actor.recorded) is written
+to a file, with the game minute and the actor's name.  The Recorder also
+seeds the random module and notes the seed, so that a Replayer can play
+the same commands into a freshly loaded world, without any prompting or
+network, and get the same game.  Commands which would ask the person
+something, or end the game (save, restore and quit), aren't recorded,
+since there's nobody to answer them in a replay.  Actors are known by
+name, so if the actor given a command shares its name with another, the
+Recorder stops rather than write a recording that can't be replayed.
+
+    pub.recorder = replay.Recorder('session.rec')
+    ...
+    pub.recorder.Close()
+
+and later, after loading the same game:
+
+    events, secs = replay.Replayer('session.rec').Run()
+
+pubrun does this with --record=FILE and --replay=FILE.
+"""
+
+# system imports
+import random
+import string
+import time
+
+# pub imports
+import pub
+from constants import *
+from pubcore import MethodEvent, fastforward
+import pubtcp
+import pubverbs
+
+#--------------------------------------------------------------------
+# findActors -- everything in the world which can be given commands
+#
+def findActors():
+    """
+    return a list of the world's actors: whatever in it takes command
+    strings, and the players
+    """
+    found = {}
+    todo = [pub.universe]
+    while todo:
+        obj = todo.pop()
+        if hasattr(obj, 'DoCommandString'): found[id(obj)] = obj
+        todo.extend(getattr(obj, 'contents', []))
+    for actor in pubtcp.NPlist + [pub.player]:
+        if actor: found[id(actor)] = actor
+    return found.values()
+
+#--------------------------------------------------------------------
+# Recorder -- writes the commands players give to a file
+#
+class Recorder:
+    """
+    Recorder:
+        writes each recorded command to a file as it is given, one per
+        line: the game minute, the actor's name and the command,
+        separated by tabs.  The first line has the random seed and
+        Close adds the time the recording stopped.
+    """
+
+    # verbs which prompt, or end the game; a replay can't do them
+    unrecorded = (pubverbs.Save, pubverbs.Restore, pubverbs.Quit)
+
+    def __init__(self, filename, seed=None):
+        if seed is None: seed = int(time.time())
+        random.seed(seed)
+        self.filename = filename
+        self.seed = seed
+        self.file = open(filename, 'w')
+        self.file.write('seed\t' + str(seed) + '\n')
+        self.file.flush()
+
+    def __getstate__(self):
+        """
+        a saved game can't carry on writing the file, since a replay
+        starts from a fresh world; so a restored Recorder is stopped
+        """
+        state = self.__dict__.copy()
+        state['file'] = None
+        return state
+
+    def Note(self, pActor, pCmdStr, pCmds):
+        """
+        record that pActor was given the command pCmdStr, which was
+        parsed into the CommandStream pCmds
+        """
+        if not self.file: return
+        for segment in pCmds.segments:
+            if isinstance(pub.verbdict.get(segment[0]), self.unrecorded):
+                return
+        for actor in findActors():
+            if actor is not pActor and actor.name == pActor.name:
+                print "WARNING: more than one actor called", pActor.name + \
+                      "; a replay couldn't tell them apart, so recording stops"
+                self.Close()
+                return
+        self.file.write('%d\t%s\t%s\n' % (pub.scheduler.minutes,
+                                          pActor.name, pCmdStr))
+        self.file.flush()
+
+    def Close(self):
+        """
+        note the time and stop recording
+        """
+        if not self.file: return
+        self.file.write('end\t' + str(pub.scheduler.minutes) + '\n')
+        self.file.close()
+        self.file = None
+
+#--------------------------------------------------------------------
+# Replayer -- plays a recording into the world
+#
+class Replayer:
+    """
+    Replayer:
+        reads a Recorder's file, so that Run can give the same commands
+        to the same actors at the same game minutes.
+    """
+    def __init__(self, filename):
+        self.seed = None
+        self.commands = []      # (minute, actor name, command string)
+        self.end = None
+        f = open(filename, 'r')
+        for line in f.readlines():
+            fields = string.split(line[:-1], '\t')
+            if fields[0] == 'seed': self.seed = int(fields[1])
+            elif fields[0] == 'end': self.end = int(fields[1])
+            elif len(fields) == 3:
+                self.commands.append((int(fields[0]), fields[1], fields[2]))
+        f.close()
+        if self.end is None and self.commands:
+            self.end = self.commands[-1][0]
+
+    def Actors(self):
+        """
+        return a dictionary of the world's actors by name
+        """
+        actors = {}
+        for actor in findActors(): actors[actor.name] = actor
+        return actors
+
+    def Start(self):
+        """
+        seed the random module and schedule the recorded commands;
+        the actors which get them are put to sleep, so they don't ask
+        for any more
+        """
+        if self.seed is not None: random.seed(self.seed)
+        actors = self.Actors()
+        for minute, name, cmdstr in self.commands:
+            if not actors.has_key(name):
+                print "WARNING: no actor called", name, "to replay to"
+                continue
+            actor = actors[name]
+            actor.sleeping = TRUE
+            pub.scheduler.AddAbsEvent(minute,
+                MethodEvent(actor, 'DoCommandString', (cmdstr,)))
+
+    def Run(self):
+        """
+        replay the recording as fast as possible, without printing
+        anything; returns the number of events performed and the
+        seconds it took (see fastforward)
+        """
+        self.Start()
+        if self.end is None: return 0, 0.0
+        return fastforward(self.end)
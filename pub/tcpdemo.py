@@ -38,7 +38,7 @@ Bert.ContainNoCheck(bag)
 
 rock = Thing("rock,stone")
 rock.desc = "It looks like an ordinary rock, except that it glows very faintly."
-rock.light = 5
+rock.Set('light', 5)
 
 pub.player = pubtcp.NetPlayer('Joe')    # put net player here
 pub.player.password = '.'
@@ -101,8 +101,8 @@ northend_w.dest = magicshop
 cloak = pubobjs.Garment("cloak")
 cloak.desc = "This magic cloak will make you invisible.  It says so, \
 right there on the tag."
-cloak.effectOnCode = "user.invisible = 1"
-cloak.effectOffCode = "user.invisible = 0"
+cloak.effectOnCode = "user.Set('invisible', 1)"
+cloak.effectOffCode = "user.Set('invisible', 0)"
 
 magicshop_e = Exit("east,e,exit,out,street")
 magicshop_e.dest = northend
@@ -149,8 +149,8 @@ clock.size = 150
 
 glasses = pubobjs.Garment('pair of glasses,glasses,pair,spectacles,eyewear')
 glasses.desc = "These magic glasses will let you see invisible objects."
-glasses.effectOnCode = "user.seesInvisible = 1"
-glasses.effectOffCode = "user.seesInvisible = 0"
+glasses.effectOnCode = "user.Set('seesInvisible', 1)"
+glasses.effectOffCode = "user.Set('seesInvisible', 0)"
 glasses.bodypart = "eyes"
 
 trans1 = gadgets.Transceiver('Transceiver1,trans1,tran1')
@@ -176,8 +176,8 @@ jack.offOnDrop = FALSE
 lamp = pubobjs.Switch('lamp')
 lamp.onDesc = 'The lamp is glowing brightly.'
 lamp.offDesc = 'The lamp is dark.'
-lamp.effectOnCode = 'self.light = 40'
-lamp.effectOffCode = 'self.light = 0'
+lamp.effectOnCode = "self.Set('light', 40)"
+lamp.effectOffCode = "self.Set('light', 0)"
 lamp.effectOn = "You turn on the lamp, and it glows brightly."
 lamp.oeffectOn = "<The actor> activates the lamp, which glows brightly."
 lamp.effectOff = "You turn off the lamp."
@@ -210,7 +210,7 @@ southend_e.dest = invisshop
 
 ring = pubobjs.Garment('ring')
 ring.desc = "You see a shimmering, transparent ring."
-ring.invisible = 1
+ring.Set('invisible', 1)
 
 invisshop_e = Exit("west,w,exit,out")
 invisshop_e.dest = southend
@@ -221,7 +221,7 @@ sewermain.desc = "You're in a sewer main under the street.  A little light \
 filters in from the edges of the manhole cover above, but it wouldn't be \
 enough for a normal human to see by.  A thin stream of dark water trickles \
 by your feet."
-sewermain.ownLight = 5
+sewermain.Set('ownLight', 5)
 southend_d.dest = sewermain
 
 sewerwater = pubobjs.Liquid('sewer water,stream,water')
@@ -235,7 +235,7 @@ sewermain_u = Exit('up,u,out,street,manhole')
 sewermain_u.dest = southend
 sewermain_u.desc = "You can see a little light filtering in from the edges \
 of the manhole.  You can just barely reach it to climb out."
-sewermain_u.light = 5
+sewermain_u.Set('light', 5)
 
 #----------------------------------------------------------------------
 #   Run the game
@@ -33,6 +33,19 @@ def runtest(name, gamepath, makeoutput):
     system('diff diff1 diff2')
     system('rm %s diff1 diff2' % testfile)
 
+#This routine records a test game, and checks that the recording
+#replays to the end without waiting for anyone.
+def replaytest(name, gamepath):
+    inputfile = pathjoin(testdir, '%s-input' % name)
+    recordfile = pathjoin(testdir, '%s-record' % name)
+    system('PYTHONPATH=%s PUBTESTING=true python pubrun %s --record=%s <%s >/dev/null'
+        % (PYTHONPATH, gamepath, recordfile, inputfile))
+    system('rm pub.dat')
+    if system('PYTHONPATH=%s PUBTESTING=true python pubrun %s --replay=%s </dev/null >/dev/null'
+        % (PYTHONPATH, gamepath, recordfile)):
+        print 'replaying %s failed' % name
+    system('rm %s' % recordfile)
+
 
 ### Main program ###
 
@@ -67,6 +80,7 @@ print "Running Integration Tests.  No output is good output:"
 #pubdemo test
 pubdemo = pathjoin(pubdir, 'pubdemo.py')
 runtest('pubdemo', pubdemo, makeoutput)
+if not makeoutput: replaytest('pubdemo', pubdemo)
 
 #Gredgar
 gredgar = pathjoin(gamesdir, 'gredgar.py')
@@ -49,6 +49,30 @@ class TestEvent(TestCase):
         """check that it doesn't refer to something else"""
         assert self.event.RefersTo(self.event) == False
         
+    def testPerformCached(self):
+        """check that code is compiled once and still runs every time"""
+        self.event.Perform()
+        assert pub.Event.codecache.has_key('self.x = 2')
+        self.event.x = 0
+        self.event.Perform()
+        assert self.event.x == 2
+
+    def testMethodPerform(self):
+        """check that a method event calls the method with its args"""
+        target = ['a']
+        event = pub.MethodEvent(target, 'append', ('b',))
+        event.Perform()
+        assert target == ['a', 'b']
+        assert event.RefersTo(target) == True
+
+    def testMethodPickle(self):
+        """check that method events survive pickling"""
+        import cPickle
+        event = pub.MethodEvent(self.obj, 'GetName')
+        event = cPickle.loads(cPickle.dumps(event))
+        assert event.method == 'GetName'
+        event.Perform()
+
 
 class TestScheduler(TestCase):
     """
@@ -81,6 +105,676 @@ class TestScheduler(TestCase):
         self.scheduler.AddEvent(1, self.event)
         assert len(self.scheduler.events) == 1 
 
+    def testPendingEvents(self):
+        """Check that the events for an object can be looked up."""
+        other = pub.Event(self.scheduler, "")
+        self.scheduler.AddEvent(1, self.event)
+        self.scheduler.AddEvent(2, other)
+        assert self.scheduler.PendingEventsFor(self.obj) == [self.event]
+        self.scheduler.Update()
+        assert self.scheduler.HasEventFor(self.obj) == False
+        assert self.scheduler.PendingEventsFor(self.obj) == []
+        assert self.scheduler.HasEventFor(self.scheduler) == True
+
+    def testEarliestFirst(self):
+        """Check that Update runs the earliest events whatever the order."""
+        self.scheduler.AddEvent(5, self.event)
+        self.scheduler.AddEvent(2, self.event)
+        self.scheduler.AddAbsEvent(self.scheduler.minutes + 3, self.event)
+        self.scheduler.Update()
+        assert self.scheduler.GetTime() == '12:02'
+        self.scheduler.Update()
+        assert self.scheduler.GetTime() == '12:03'
+
+    def testPickle(self):
+        """Check that a pickled Scheduler keeps its events in order."""
+        import cPickle
+        self.scheduler.AddEvent(4, self.event)
+        self.scheduler.AddEvent(1, self.event)
+        scheduler = cPickle.loads(cPickle.dumps(self.scheduler))
+        assert not scheduler.__getstate__().has_key('eventtimes')
+        scheduler.Update()
+        assert scheduler.GetTime() == '12:01'
+        scheduler.Update()
+        assert scheduler.GetTime() == '12:04'
+
+    def testCancel(self):
+        """Check that a cancelled event is skipped and no longer pending."""
+        event = pub.Event(self.obj, "self.x = 1")
+        self.scheduler.AddEvent(1, event)
+        self.scheduler.AddEvent(2, self.event)
+        self.scheduler.Cancel(event)
+        assert self.scheduler.HasEventFor(self.obj) == True
+        self.scheduler.CancelFor(self.obj)
+        assert self.scheduler.HasEventFor(self.obj) == False
+        self.scheduler.Update()
+        assert not hasattr(event, 'x')
+        assert not self.scheduler.events
+
+    def testCompact(self):
+        """Check that enough cancelled events get compacted away."""
+        for i in range(pub.pubcore.MINCOMPACT + 1):
+            event = pub.Event(self.obj, "")
+            self.scheduler.AddEvent(i + 1, event)
+            self.scheduler.Cancel(event)
+        self.scheduler.AddEvent(1, self.event)
+        assert self.scheduler.events.values() == [[self.event]]
+        assert self.scheduler.deadcount == 0
+
+    def testLiveCount(self):
+        """Check that only events still to be performed are counted."""
+        event = pub.Event(self.obj, "")
+        self.scheduler.AddEvent(1, self.event)
+        self.scheduler.AddEvent(1, event)
+        self.scheduler.AddEvent(2, event)
+        self.scheduler.Cancel(event)
+        assert (self.scheduler.livecount, self.scheduler.deadcount) == (1, 2)
+        self.scheduler.Update()
+        assert (self.scheduler.livecount, self.scheduler.deadcount) == (0, 1)
+
+    def testReviveNoDead(self):
+        """Check that reviving doesn't compact a queue with no dead."""
+        self.scheduler.AddEvent(1, self.event)
+        queue = self.scheduler.eventtimes
+        event = pub.Event(self.obj, "")
+        event.cancelled = True
+        self.scheduler.AddEvent(2, event)
+        assert self.scheduler.eventtimes is queue and not event.cancelled
+
+    def testFastForward(self):
+        """Check that fastforward stops at the given time, quietly."""
+        scheduler = pub.scheduler
+        pub.scheduler = self.scheduler
+        for i in range(5):
+            self.scheduler.AddEvent(i + 1, pub.Event(self.obj, "print 'x'"))
+        try: performed, secs = pub.fastforward(self.scheduler.minutes + 3)
+        finally: pub.scheduler = scheduler
+        assert performed == 3
+        assert self.scheduler.GetTime() == '12:03'
+
+    def testFastForwardStops(self):
+        """Check that fastforward doesn't go past its time or count."""
+        scheduler = pub.scheduler
+        pub.scheduler = self.scheduler
+        self.scheduler.AddEvent(1, pub.Event(self.obj, "print 'x'"))
+        later = pub.Event(self.obj, "print 'y'")
+        self.scheduler.AddEvent(10, later)
+        try: performed, secs = pub.fastforward(self.scheduler.minutes + 5)
+        finally: pub.scheduler = scheduler
+        assert performed == 1
+        assert self.scheduler.GetTime() == '12:01'
+        assert self.scheduler.PendingEventsFor(self.obj) == [later]
+        for i in range(3):
+            self.scheduler.AddEvent(1, pub.Event(self.obj, "print 'z'"))
+        pub.scheduler = self.scheduler
+        try: performed, secs = pub.fastforward(maxevents=2)
+        finally: pub.scheduler = scheduler
+        assert performed == 2
+        assert self.scheduler.GetTime() == '12:02'
+        assert len(self.scheduler.PendingEventsFor(self.obj)) == 2
+
+    def testStats(self):
+        """Check that statistics are kept by event kind when asked for."""
+        self.scheduler.stats = pub.SchedulerStats(self.scheduler)
+        self.scheduler.AddEvent(1, self.event)
+        self.scheduler.AddEvent(1, pub.MethodEvent(self.obj, 'GetName'))
+        self.scheduler.Update()
+        kinds = self.scheduler.stats.kinds.keys()
+        kinds.sort()
+        assert kinds == ['', 'BaseThing.GetName']
+        assert self.scheduler.stats.perminute == {721: 2}
+        assert self.scheduler.stats.Report()
+
+    def testStatsCounts(self):
+        """Check that cancelled events aren't counted, and pending are."""
+        self.scheduler.stats = pub.SchedulerStats(self.scheduler)
+        event = pub.Event(self.obj, "")
+        self.scheduler.AddEvent(1, event)
+        self.scheduler.AddEvent(1, self.event)
+        self.scheduler.AddEvent(2, self.event)
+        self.scheduler.AddEvent(3, self.event)
+        self.scheduler.Cancel(event)
+        self.scheduler.Update()
+        self.scheduler.Update()
+        stats = self.scheduler.stats
+        assert stats.perminute == {721: 1, 722: 1}
+        assert (stats.depthmin, stats.depthmax, stats.depthsum) == (1, 2, 3)
+
+    def testTimingWheel(self):
+        """Check that a TimingWheel gives times back in order."""
+        times = [5, 300, 1, 70000, 256, 0, 1000000, 299]
+        wheel = pub.TimingWheel(times[:4])
+        for time in times[4:]: wheel.Push(time)
+        times.sort()
+        assert [wheel.Pop() for time in times] == times
+
+    def testWheelJump(self):
+        """Check that a TimingWheel follows the clock a long way."""
+        wheel = pub.TimingWheel()
+        wheel.Push(720)
+        wheel.Pop()
+        wheel.Push(70720)
+        assert wheel.Pop() == 70720
+        for time in range(70721, 70731): wheel.Push(time)
+        assert not wheel.overflow and wheel.finecount == 10
+        assert wheel.Peek() == 70721 and wheel.Pop() == 70721
+
+    def testWheelScheduler(self):
+        """Check that a Scheduler can use a TimingWheel and pickle it."""
+        import cPickle
+        scheduler = pub.Scheduler('12:00', pub.TimingWheel)
+        scheduler.AddEvent(300, self.event)
+        scheduler.AddEvent(2, self.event)
+        scheduler = cPickle.loads(cPickle.dumps(scheduler))
+        assert scheduler.eventtimes.__class__ == pub.TimingWheel
+        scheduler.Update()
+        assert scheduler.GetTime() == '12:02'
+        scheduler.Update()
+        assert scheduler.GetTime() == '17:00'
+
+
+class TestTurnScheduler(TestCase):
+    """
+    Tests for the turn-counting scheduler.
+    """
+
+    def setUp(self):
+        self.scheduler = pub.TurnScheduler()
+        self.obj = pub.BaseThing('obj')
+
+    def testSkipIdle(self):
+        """Check that turns with nothing to do are jumped over."""
+        self.scheduler.AddEvent(500, pub.Event(self.obj, ""))
+        self.scheduler.Update()
+        assert self.scheduler.GetTime() == 'turn 500'
+
+    def testNextTurn(self):
+        """Check that events scheduled for now during a turn wait a turn."""
+        self.scheduler.AddEvent(1, pub.Event(self.scheduler,
+            "object.AddEvent(0, pub.Event(object, ''))"))
+        self.scheduler.Update()
+        assert self.scheduler.events.keys() == [self.scheduler.minutes + 1]
+
+    def testTakeOver(self):
+        """Check that a TurnScheduler can take over a game's Scheduler."""
+        scheduler = pub.Scheduler('9:00')
+        scheduler.AddEvent(3, pub.Event(self.obj, ""))
+        self.scheduler.TakeOver(scheduler)
+        assert self.scheduler.HasEventFor(self.obj) == True
+        self.scheduler.Update()
+        assert self.scheduler.GetTurn() == 3
+
+    def testClock(self):
+        """Check that <time> in a message gives the turn."""
+        self.scheduler.AddEvent(4, pub.Event(self.obj, ""))
+        self.scheduler.Update()
+        scheduler = pub.scheduler
+        pub.scheduler = self.scheduler
+        try: out = pub.Command().StuffString('The clock reads <time>.')
+        finally: pub.scheduler = scheduler
+        assert out == 'The clock reads turn 4.'
+
+
+class TestNounWords(TestCase):
+    """
+    Tests for finding nouns made of several words.
+    """
+
+    def setUp(self):
+        self.par = pub.Parser()
+
+    def testLongest(self):
+        """Check that the longest noun is found, even at a word's start."""
+        assert self.par.NounWords(['fish', 'bucket', 'to', 'bob']) == 2
+        assert self.par.NounWords(['fish', 'buckets']) == 2
+        assert self.par.NounWords(['bucket', 'to', 'bob']) == 1
+        assert self.par.NounWords(['give', 'bucket']) == 0
+
+    def testSpecial(self):
+        """Check that numbers, quotes and 'it' are still single nouns."""
+        assert self.par.NounWords(['3', 'rock']) == 1
+        assert self.par.NounWords(['"fish bucket"']) == 1
+        assert self.par.NounWords(['it', 'bucket']) == 1
+
+    def testNewNoun(self):
+        """Check that nouns added to the list are found."""
+        pub.pubcore.nouns.append('rock pile')
+        try: assert self.par.NounWords(['rock', 'pile']) == 2
+        finally: pub.pubcore.nouns.remove('rock pile')
+        assert self.par.NounWords(['rock', 'pile']) == 1
+
+
+class TestLexicon(TestCase):
+    """
+    Tests for the Lexicon word lists.
+    """
+
+    def setUp(self):
+        self.lex = pub.Lexicon(['look', 'drop'], keepsorted=True)
+
+    def testMembership(self):
+        """Check that words added any way are found, and removed ones not."""
+        self.lex.Add('get')
+        self.lex.append('wave')
+        self.lex.remove('drop')
+        assert 'get' in self.lex and 'wave' in self.lex
+        assert 'drop' not in self.lex
+
+    def testSorted(self):
+        """Check that Add keeps a sorted lexicon sorted, once per word."""
+        self.lex.Add('go')
+        self.lex.Add('go')
+        assert self.lex == ['drop', 'go', 'look']
+
+    def testAddOnce(self):
+        """Check that Add to a sorted lexicon doesn't recount it."""
+        counts = self.lex.counts
+        version = self.lex.version
+        self.lex.Add('get')
+        assert self.lex.counts is counts and counts['get'] == 1
+        assert self.lex.version == version + 1
+
+    def testVersion(self):
+        """Check that the version changes with the words."""
+        version = self.lex.version
+        self.lex.Add('look')
+        assert self.lex.version == version
+        self.lex[0] = 'eat'
+        assert self.lex.version != version
+        assert 'eat' in self.lex and 'drop' not in self.lex
+
+
+class TestBreakString(TestCase):
+    """
+    Tests for breaking strings into words, and parsing them.
+    """
+
+    def setUp(self):
+        self.par = pub.Parser()
+
+    def testWords(self):
+        """Check garbage, commas and case, outside quotes and in."""
+        words = self.par.BreakString('Get the fish,rock , A "Big Fish" ok')
+        assert words == ['get', 'fish', 'and', 'rock', '"Big Fish', 'ok']
+        assert self.par.BreakString('say "unfinished') == ['say',
+                                                           '"unfinished']
+
+    def testSeveral(self):
+        """Check that several commands come out in order."""
+        cmds = self.par.Parse('get fish and rock then put it in bucket')
+        assert [(c.verb, c.dirobj, c.inobj) for c in cmds] == \
+            [('get', 'fish', ''), ('get', 'rock', ''),
+             ('put', 'fish', 'bucket'), ('put', 'rock', 'bucket')]
+
+    def testTrailingConjunction(self):
+        """Check that a conjunction at the end is just ignored."""
+        cmds = self.par.Parse('get fish and')
+        assert [c.dirobj for c in cmds] == ['fish']
+        assert self.par.Parse('look on and')[0].verb == 'look on'
+
+
+class TestCommandStream(TestCase):
+    """
+    Tests for making parsed commands one at a time.
+    """
+
+    def testSameAsParse(self):
+        """Check that a stream gives what Parse does, in the same order."""
+        par = pub.Parser()
+        text = 'put fish, rock and bucket in bucket and fish with rock then look'
+        stream = par.ParseStream(text)
+        assert len(stream) == 7
+        cmds = par.Parse(text)
+        for cmd in cmds:
+            assert str(stream.Next()) == str(cmd)
+        assert not stream and stream.Next() is None
+
+    def testHuge(self):
+        """Check that a huge product of objects isn't made all at once."""
+        objs = map(str, range(1000))
+        stream = pub.CommandStream([('get', objs, objs, objs, [''], [''])])
+        assert len(stream) == 1000000000
+        cmd = stream.Next()
+        assert (cmd.dirobj, cmd.toobj, cmd.inobj) == ('0', '0', '0')
+        cmd = stream.Next()
+        assert (cmd.dirobj, cmd.toobj, cmd.inobj) == ('0', '0', '1')
+
+    def testPickle(self):
+        """Check that a stream carries on where it was after pickling."""
+        import cPickle
+        stream = pub.CommandStream([('get', ['a', 'b'], [''], [''], [''],
+                                     ['']), ('look', [''], [''], [''], [''],
+                                     [''])])
+        stream.Next()
+        stream = cPickle.loads(cPickle.dumps(stream))
+        assert [cmd.dirobj for cmd in stream] == ['b', '']
+
+
+class TestParseCache(TestCase):
+    """
+    Tests for remembering what strings were parsed into.
+    """
+
+    def setUp(self):
+        self.par = pub.Parser()
+        self.cache = pub.Parser.cache
+        self.cache.Clear()
+
+    def testHit(self):
+        """Check that the same command is parsed once, and comes out the same."""
+        first = self.par.Parse('get fish and rock')
+        misses = self.cache.misses
+        again = self.par.Parse('GET  fish and rock')
+        assert self.cache.misses == misses
+        assert map(str, again) == map(str, first)
+        assert again[0] is not first[0]
+
+    def testIt(self):
+        """Check that 'it' means whatever it meant when it was said."""
+        self.par.Parse('get fish')
+        assert self.par.Parse('eat it')[0].dirobj == 'fish'
+        self.par.Parse('look')
+        self.par.Parse('get rock')
+        self.par.Parse('look')
+        assert self.par.it == ['rock']
+        self.par.Parse('get rock')
+        assert self.par.Parse('eat it')[0].dirobj == 'rock'
+        self.par.Parse('get fish')
+        assert self.par.Parse('eat it')[0].dirobj == 'fish'
+
+    def testLexicon(self):
+        """Check that a new noun is noticed."""
+        assert self.par.Parse('get rock pile')[0].dirobj == 'rock'
+        pub.pubcore.nouns.Add('rock pile')
+        try: assert self.par.Parse('get rock pile')[0].dirobj == 'rock pile'
+        finally: pub.pubcore.nouns.remove('rock pile')
+
+    def testMany(self):
+        """Check that a batch is parsed as each parser would have, once."""
+        other = pub.Parser()
+        other.it = ['rock']
+        self.par.it = ['fish']
+        streams = self.par.ParseMany(['eat it', 'eat it', 'look'],
+                                     [self.par, other, other])
+        assert [list(stream)[0].dirobj for stream in streams[:2]] == \
+            ['fish', 'rock']
+        misses = self.cache.misses
+        self.par.ParseMany(['look', 'look'])
+        assert self.cache.misses == misses
+
+    def testLeastRecent(self):
+        """Check that a full cache forgets what was used longest ago."""
+        cache = pub.ParseCache(8)
+        for i in range(20):
+            cache.Put(i, i)
+            cache.Get(i)
+        assert len(cache) == 8
+        assert cache.Get(19) == 19 and cache.Get(0) is None
+
+
+class TestNameIndex(TestCase):
+    """
+    Tests for finding things by name through their containers' indexes.
+    """
+    def setUp(self):
+        """Make a room with a player, a box and some coins in it"""
+        self.room = pub.objs.Room('vault')
+        self.actor = pub.objs.Actor('tester')
+        self.box = pub.objs.Container('box,crate')
+        self.box.size = 50
+        self.coins = pub.objs.Countable('coin,coins')
+        self.coins.quantity = 5
+        self.gem = pub.objs.Thing('gem,coin')
+        self.actor.MoveTo(self.room)
+        self.box.MoveTo(self.room)
+        self.coins.MoveTo(self.box)
+        self.gem.MoveTo(self.actor)
+
+    def scanned(self, pName):
+        """what searching LocalNouns finds for pName"""
+        return filter(lambda x,a=pName: x.NameMatch(a), self.actor.LocalNouns())
+
+    def testSameAsScan(self):
+        """Check that the indexes find what searching everything would."""
+        for name in ['coin', 'coins', 'crate', '3 coins', '9 coins', 'tester']:
+            found = []
+            for cont in self.actor.NounScope():
+                found.extend(cont.NameMatches(name))
+            assert found == self.scanned(name)
+        assert self.actor.FindNoun('coin') == self.scanned('coin')[0]
+
+    def testMoves(self):
+        """Check that the indexes follow things as they move."""
+        self.actor.NounScope()
+        self.gem.MoveTo(self.box)
+        assert self.box.NameMatches('gem') == [self.gem]
+        assert self.actor.NameMatches('gem') == []
+        self.gem.MoveTo('TRASH')
+        assert self.box.NameMatches('gem') == []
+        assert self.box.NameMatches('coin') == [self.coins]
+
+    def testSplit(self):
+        """Check that a split Countable's new part is indexed."""
+        self.box.Names()
+        self.coins.Split(2)
+        found = self.box.NameMatches('coins')
+        assert len(found) == 2 and found[0] == self.coins
+        found[0].Absorb(found[1])
+        assert self.box.NameMatches('coins') == [self.coins]
+
+    def testNotSaved(self):
+        """Check that the index is left out of saved games."""
+        self.box.Names()
+        assert not self.box.__getstate__().has_key('nameindex')
+
+
+class TestVisibleContents(TestCase):
+    """
+    Tests for remembering what's visible in a container.
+    """
+    def setUp(self):
+        """Make a room with a chest, with a bag in it"""
+        self.room = pub.objs.Room('attic')
+        self.chest = pub.objs.Container('chest')
+        self.chest.size = 100
+        self.bag = pub.objs.Container('bag')
+        self.bag.size = 50
+        self.bag.MoveTo(self.chest)
+        self.ring = pub.objs.Thing('ring')
+        self.ring.size = 1
+
+    def testChanges(self):
+        """Check that things put in or taken out deep down are noticed."""
+        assert self.room.VisibleContents() == [self.chest, self.ring,
+                                               self.bag]
+        self.ring.MoveTo(self.bag)
+        assert self.room.VisibleContents() == [self.chest, self.bag,
+                                               self.ring]
+        assert self.chest.VisibleContents() == [self.bag, self.ring]
+        self.ring.MoveTo('TRASH')
+        assert self.room.VisibleContents() == [self.chest, self.bag]
+        assert self.room.VisibleContainers() == [self.room, self.chest,
+                                                 self.bag]
+
+    def testNewContainer(self):
+        """Check that a container made after a lookup is looked in."""
+        self.room.VisibleContainers()
+        self.room.NameMatches('ring')
+        box = pub.objs.Container('box')
+        box.size = 20
+        self.ring.MoveTo(box)
+        assert self.room.VisibleContainers()[-1] == box
+        assert self.room.VisibleContents()[-1] == self.ring
+
+
+class TestRoomLight(TestCase):
+    """
+    Tests for keeping rooms' total light up to date.
+    """
+    def setUp(self):
+        """Make a dim room with a bag, and a lamp in the bag"""
+        self.room = pub.objs.Room('cellar')
+        self.room.Set('ownLight', 5)
+        self.bag = pub.objs.Container('bag')
+        self.bag.size = 50
+        self.lamp = pub.objs.Thing('lamp')
+        self.lamp.MoveTo(self.bag)
+
+    def testChanges(self):
+        """Check that light changes deep inside reach the room."""
+        assert self.room.light == 5
+        self.lamp.Set('light', 40)
+        assert self.room.light == 45
+        self.bag.Set('light', 3)
+        assert self.room.light == 48
+        self.room.Set('ownLight', 0)
+        assert self.room.light == 43
+
+    def testMoves(self):
+        """Check that moving a lit container moves its light."""
+        self.lamp.Set('light', 40)
+        other = pub.objs.Room('stairs')
+        self.bag.MoveTo(other)
+        assert (self.room.light, other.light) == (5, 115)
+        self.lamp.MoveTo('TRASH')
+        assert other.light == 75
+        assert other.light == other.ComputeTotalLight()
+
+    def testNotSaved(self):
+        """Check that a restored room counts its light again."""
+        import cPickle
+        self.room.LightSum()
+        self.room.MoveTo('TRASH')       # (so the universe isn't pickled too)
+        self.room.container = None
+        pub.restoring = True
+        try: room = cPickle.loads(cPickle.dumps(self.room))
+        finally: pub.restoring = False
+        assert room.lightsum is None and room.light == 5
+
+
+class TestGetRoom(TestCase):
+    """
+    Tests for remembering which room things are in.
+    """
+    def testMoves(self):
+        """Check that moving a container moves what's in it too."""
+        hall = pub.objs.Room('hall')
+        bag = pub.objs.Container('bag')
+        bag.size = 50
+        apple = pub.objs.Thing('apple')
+        apple.MoveTo(bag)
+        assert apple.GetRoom() == hall and apple.enclosingroom == hall
+        kitchen = pub.objs.Room('kitchen')
+        bag.MoveTo(kitchen)
+        assert apple.GetRoom() == kitchen and bag.GetRoom() == kitchen
+        assert kitchen.GetRoom() == kitchen
+
+
+class TestSightCache(TestCase):
+    """
+    Tests for rooms remembering who can see what.
+    """
+    def setUp(self):
+        """Make a dim room with a looker and a vase in it"""
+        self.room = pub.objs.Room('attic')
+        self.room.Set('ownLight', 15)
+        self.looker = pub.objs.Thing('looker')
+        self.vase = pub.objs.Thing('vase')
+
+    def testRemembered(self):
+        """Check that asking again doesn't work it out again."""
+        assert not self.looker.CanSee(self.vase)
+        assert not self.looker.CanSee(self.vase)
+        cache = self.room.sightcache
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def testChanges(self):
+        """Check that light, moves and sight changes are noticed."""
+        assert not self.looker.CanSee(self.vase)
+        self.room.Set('ownLight', 75)
+        assert self.looker.CanSee(self.vase)
+        self.vase.Set('invisible', 1)
+        assert not self.looker.CanSee(self.vase)
+        self.looker.Set('seesInvisible', 1)
+        assert self.looker.CanSee(self.vase)
+        self.looker.blind = 1
+        assert not self.looker.CanSee(self.vase)
+        self.looker.blind = 0
+        self.room.Set('ownLight', 0)
+        assert not self.looker.CanSee(self.vase)
+        lamp = pub.objs.Thing('lamp')
+        lamp.Set('light', 30)
+        assert self.looker.CanSee(self.vase)
+        lamp.MoveTo('TRASH')
+        assert not self.looker.CanSee(self.vase)
+
+
+class TestListeners(TestCase):
+    """
+    Tests for keeping track of what's listening in a room.
+    """
+    def setUp(self):
+        """Make a room with a rock, and a radio in a bag"""
+        self.room = pub.objs.Room('den')
+        self.rock = pub.objs.Thing('rock')
+        self.bag = pub.objs.Container('bag')
+        self.bag.size = 50
+        self.radio = pub.objs.Thing('radio')
+        self.radio.MoveTo(self.bag)
+
+    def testListening(self):
+        """Check that starting and stopping listening is noticed."""
+        assert self.room.Listeners() == []
+        self.radio.Set('listening', 1)
+        assert self.room.Listeners() == [self.radio]
+        assert self.bag.Listeners() == [self.radio]
+        self.rock.Set('listening', 1)
+        assert self.room.Listeners() == [self.rock, self.radio]
+        self.radio.Set('listening', 0)
+        assert self.room.Listeners() == [self.rock]
+
+    def testMoves(self):
+        """Check that listeners moving in and out are noticed."""
+        self.radio.Set('listening', 1)
+        assert self.room.Listeners() == [self.radio]
+        other = pub.objs.Room('hall')
+        self.bag.MoveTo(other)
+        assert (self.room.Listeners(), other.Listeners()) == ([], [self.radio])
+        self.radio.MoveTo(other)
+        self.radio.Set('listening', 0)
+        assert other.Listeners() == []
+
+
+class TestTemplate(TestCase):
+    """
+    Tests for filling in messages' placeholders.
+    """
+    def setUp(self):
+        """Make a command: the troll gets the apple"""
+        self.room = pub.objs.Room('cave')
+        self.cmd = pub.Command()
+        self.cmd.actor = pub.objs.Thing('troll')
+        self.cmd.dirobj = pub.objs.Thing('apple')
+        self.cmd.dirobj.a = 'an'
+
+    def testFill(self):
+        """Check that placeholders are filled in, and others left."""
+        out = self.cmd.StuffString('<The actor> eats <a dirobj> from <the inobj>.')
+        assert out == 'The troll eats an apple from <the inobj>.'
+        out = self.cmd.StuffString('<Dirobj>? <dirobj>! <<actor>>')
+        assert out == 'Apple? apple! <troll>'
+        assert self.cmd.StuffString('no places <here') == 'no places <here'
+
+    def testCompiledOnce(self):
+        """Check that a message is only split up once."""
+        msg = '<The dirobj> rolls away from <the actor>.'
+        first = pub.pubcore.templates.Get(msg) is None
+        self.cmd.StuffString(msg)
+        tmpl = pub.pubcore.templates.Get(msg)
+        self.cmd.StuffString(msg)
+        assert first and pub.pubcore.templates.Get(msg) is tmpl
+        assert len(tmpl.parts) == 4
+
     
 
 class TestParser(TestCase):
@@ -102,6 +796,133 @@ class TestParser(TestCase):
 #   I'm not sure what to test on the parser yet.
         
 
+class TestWake(TestCase):
+    """
+    Tests for waking input-driven actors which have gone to sleep.
+    """
+    def setUp(self):
+        """Make a lobby with a net player in it"""
+        self.scheduler = pub.scheduler
+        pub.scheduler = pub.Scheduler()
+        self.room = pub.objs.Room('lobby')
+        self.player = pub.pubtcp.NetPlayer('visitor')
+
+    def tearDown(self):
+        self.player.MoveTo('TRASH')
+        pub.pubtcp.NPlist.remove(self.player)
+        pub.scheduler = self.scheduler
+
+    def settle(self):
+        """perform events until there are none"""
+        for i in range(50):
+            if not pub.scheduler.events: return
+            pub.scheduler.Update()
+
+    def testInput(self):
+        """Check that input is acted on, then the player sleeps."""
+        self.player.HandleMsg('look')
+        assert pub.scheduler.HasEventFor(self.player)
+        self.settle()
+        assert self.player.sleeping and not self.player.inbuf
+
+    def testQuit(self):
+        """Check that a player who quit can be woken again."""
+        self.player.HandleMsg('quit')
+        self.settle()
+        assert self.player.sleeping
+        self.player.HandleMsg('look')
+        assert pub.scheduler.HasEventFor(self.player)
+
+    def testBusy(self):
+        """Check that a player woken while busy can be woken again."""
+        pub.scheduler.AddEvent(5, pub.MethodEvent(self.player, 'Tell', ('x',)))
+        self.player.HandleMsg('look')
+        self.settle()
+        assert self.player.inbuf == ['look']
+        self.player.HandleMsg('look')
+        self.settle()
+        assert not self.player.inbuf
+
+    def testDisconnect(self):
+        """Check that a disconnected player's events are cancelled."""
+        pub.scheduler.AddEvent(5, pub.MethodEvent(self.player, 'Tell', ('x',)))
+        pub.pubtcp.Disconnect(self.player)
+        assert not pub.scheduler.HasEventFor(self.player)
+
+    def testOldSave(self):
+        """Check that an actor saved before it could sleep wakes."""
+        del self.player.__dict__['sleeping']
+        assert not self.player.sleeping
+        self.player.Wake()
+        assert pub.scheduler.HasEventFor(self.player)
+
+    def testCGI(self):
+        """Check that a CGI player who quit can be woken again."""
+        import pub.pubcgi
+        player = pub.pubcgi.CGIPlayer('surfer')
+        status = pub.gameStatus
+        try:
+            player.HandleMsg('quit')
+            self.settle()
+        finally: pub.gameStatus = status
+        assert player.sleeping
+        player.HandleMsg('look')
+        assert pub.scheduler.HasEventFor(player)
+        player.MoveTo('TRASH')
+
+    def testStaleParse(self):
+        """Check that a command parsed before things changed is reparsed."""
+        given = []
+        self.player.DoCommandString = lambda s, c=None: given.append(c)
+        self.player.MoveTo(self.room)
+        bob = pub.objs.Actor('bob')
+        bob.MoveTo(self.room)
+        try:
+            self.player.inbuf = ['look', 'bob, look', 'look']
+            pub.pubtcp.ParseInput([self.player])
+            self.player.Act()
+            bob.MoveTo('TRASH')         # (so it's no longer said to him)
+            pub.scheduler.Update()      # (it woke itself for the rest)
+            pub.pubcore.nouns.Add('bobbin')
+            pub.pubcore.nouns.remove('bobbin')
+            pub.scheduler.Update()
+        finally: del self.player.DoCommandString
+        assert given[0] is not None and given[1:] == [None, None]
+
+
+class TestRecorder(TestCase):
+    """
+    Tests for recording the commands players give.
+    """
+
+    def setUp(self):
+        """Make a recorder, and a room with an actor in it"""
+        import tempfile, pub.replay
+        self.scheduler = pub.scheduler
+        pub.scheduler = pub.Scheduler()
+        self.filename = tempfile.mktemp()
+        self.recorder = pub.replay.Recorder(self.filename, 1)
+        self.room = pub.objs.Room('hall')
+        self.bob = pub.objs.Actor('bob')
+
+    def tearDown(self):
+        import os
+        self.recorder.Close()
+        self.room.MoveTo('TRASH')
+        os.remove(self.filename)
+        pub.scheduler = self.scheduler
+
+    def testSameName(self):
+        """Check that recording stops once an actor's name is shared."""
+        look = pub.Parser().ParseStream('look')
+        self.recorder.Note(self.bob, 'look', look)
+        pub.objs.Actor('bob')
+        self.recorder.Note(self.bob, 'look', look)
+        assert not self.recorder.file
+        lines = open(self.filename).readlines()
+        assert len(lines) == 3 and lines[1].split('\t')[1:] == ['bob', 'look\n']
+
+
 class TestCommand(TestCase):
     """
     Run a command test
@@ -126,7 +947,12 @@ class TestBaseThing(TestCase):
     """
     """
 
-suitelist = [TestMain, TestScheduler, TestEvent, TestCommand]
+suitelist = [TestMain, TestScheduler, TestTurnScheduler, TestEvent, TestCommand,
+             TestNounWords, TestLexicon, TestBreakString,
+             TestCommandStream, TestParseCache, TestNameIndex,
+             TestVisibleContents, TestRoomLight, TestGetRoom,
+             TestSightCache, TestListeners, TestTemplate, TestWake,
+             TestRecorder]
 suite = TestSuite([makeSuite(suite) for suite in suitelist])
 
 if __name__ == '__main__': main()
@@ -49,6 +49,7 @@ import types
 import copy
 import random
 import re
+import heapq
 
 # pub imports
 
@@ -130,7 +131,8 @@ class Scheduler:
         timeparts = string.split(pTimeString,':')
         self.minutes = string.atoi(timeparts[0])*60 \
                        + string.atoi(timeparts[1])
-        self.events = {}
+        self.events = {}        # time -> list of events due at that time
+        self.eventtimes = []    # heap of the times used as keys in events
     
     def __str__(self):
         """
@@ -140,6 +142,23 @@ class Scheduler:
         return '< Scheduler at time ' + self.GetTime() \
                 + ' and ' + str(len(self.events)) + ' events >'
 
+    def __getstate__(self):
+        """
+        the heap is derived from self.events, so leave it out of saved
+        games; that keeps them loadable by (and from) older versions
+        """
+        state = self.__dict__.copy()
+        del state['eventtimes']
+        return state
+
+    def __setstate__(self, state):
+        """
+        restore a pickled scheduler and rebuild the heap of event times
+        """
+        self.__dict__.update(state)
+        self.eventtimes = self.events.keys()
+        heapq.heapify(self.eventtimes)
+
     def GetTime(self):
         """
         Get the time of day
@@ -158,6 +177,7 @@ class Scheduler:
             self.events[pAbsTime].append(pEvent)
         else:
             self.events[pAbsTime] = [pEvent]
+            heapq.heappush(self.eventtimes, pAbsTime)
     
     def AddEvent(self,pRelTime,pEvent):
         """AddEvent:
@@ -170,16 +190,19 @@ class Scheduler:
         time = int(self.minutes) + int(pRelTime)
         if self.events.has_key(time):
             self.events[time].append(pEvent)
-        else: self.events[time] = [pEvent]
+        else:
+            self.events[time] = [pEvent]
+            heapq.heappush(self.eventtimes, time)
 
     def Update(self):
         """
         update the scheduler
+
+        The times in self.events are kept in a heap, so finding the
+        earliest one doesn't mean sorting all of them on every update.
         """
         if not self.events: return
-        eventkeys = self.events.keys()        # get event times
-        eventkeys.sort()            # sort them
-        nexteventkey = eventkeys[0]        # find earliest time
+        nexteventkey = heapq.heappop(self.eventtimes)    # find earliest time
         self.minutes = nexteventkey        # update clock
         eventlist = self.events[nexteventkey]
         del self.events[nexteventkey]        # remove from the queue